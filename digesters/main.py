@@ -6,22 +6,123 @@
 """
 
 import os
+import argparse
+from datetime import date
 from modules.folder_processor import read_folder_path, process_folder
-from modules.database_viewer import get_points_summary
+from modules.database_viewer import get_points_summary, create_excel_report, search_points
+from modules.parquet_export import export_points_to_parquet
+
+def parse_date(value):
+    """Проверяет дату в формате ГГГГ-ММ-ДД"""
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"дата должна быть в формате ГГГГ-ММ-ДД: {value}")
+
+def parse_args():
+    """Разбирает аргументы командной строки"""
+    parser = argparse.ArgumentParser(description="Анализ файлов и формирование отчетов")
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help="не пересоздавать базу: разбирать только новые и измененные файлы"
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        metavar='N',
+        help="число процессов для чтения и разбора файлов и для создания отчетов (по умолчанию 1)"
+    )
+    parser.add_argument(
+        '--in-memory',
+        action='store_true',
+        help="загружать в базу в памяти и сохранить ее на диск одним проходом в конце "
+             "(быстрее; при сбое прежняя база остается нетронутой)"
+    )
+    parser.add_argument(
+        '--search',
+        metavar='ЗАПРОС',
+        help="найти пункты по тексту в уже загруженной базе (без анализа папки)"
+    )
+    parser.add_argument(
+        '--folder',
+        help="ограничить поиск папкой (например, КП)"
+    )
+    parser.add_argument(
+        '--tag',
+        help="ограничить поиск тегом"
+    )
+    parser.add_argument(
+        '--limit',
+        type=int,
+        default=50,
+        metavar='N',
+        help="сколько результатов поиска показать (по умолчанию 50)"
+    )
+    parser.add_argument(
+        '--months',
+        nargs='+',
+        metavar='МЕСЯЦ',
+        help="поиск и выгрузка только по этим месяцам (например, ИЮЛЬ АВГУСТ; по умолчанию все)"
+    )
+    parser.add_argument(
+        '--report',
+        action='store_true',
+        help="только создать отчеты по уже загруженной базе (без анализа папки)"
+    )
+    parser.add_argument(
+        '--from',
+        dest='date_from',
+        type=parse_date,
+        metavar='ГГГГ-ММ-ДД',
+        help="отчет за период: первая дата выхода в эфир"
+    )
+    parser.add_argument(
+        '--to',
+        dest='date_to',
+        type=parse_date,
+        metavar='ГГГГ-ММ-ДД',
+        help="отчет за период: последняя дата выхода в эфир (включительно)"
+    )
+    parser.add_argument(
+        '--export-parquet',
+        nargs='?',
+        const='parquet',
+        metavar='ПАПКА',
+        help="выгрузить пункты в Parquet по месяцам и папкам (по умолчанию в ./parquet)"
+    )
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+    
     try:
         
+        if args.search:
+            search_points(args.search, folder=args.folder, tag=args.tag, limit=args.limit,
+                          months=args.months)
+            return
+        
+        if args.export_parquet:
+            export_points_to_parquet(args.export_parquet, months=args.months)
+            return
+        
+        if args.report:
+            create_excel_report(args.date_from, args.date_to, args.jobs)
+            return
+        
         folder_path = read_folder_path()
         print(f"📂 Папка для анализа: {folder_path}")
         print("=" * 40)
         
         print("🔄 Выполняется анализ...")
-        db_manager = process_folder()
+        db_manager = process_folder(incremental=args.incremental, jobs=args.jobs,
+                                   in_memory=args.in_memory)
         print("=" * 40)
         
         print("📊 Общая сводка:")
-        get_points_summary()
+        get_points_summary(args.date_from, args.date_to, args.jobs)
                 
     except Exception as e:
         print(f"❌ Ошибка: {e}")
@@ -7,85 +7,716 @@
 
 import sqlite3
 import os
+import re
+import contextlib
+import yaml
 from pathlib import Path
 from datetime import datetime
+from modules.records import FileRecord, FileState, RollupRow, SearchRow, point_row_type, row_factory
+
+# Настройки соединения: журнал WAL (читатели не блокируют писателя),
+# fsync только на контрольных точках, кэш страниц 64 МБ и mmap до 256 МБ
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA cache_size = -65536',
+    'PRAGMA mmap_size = 268435456',
+    'PRAGMA temp_store = MEMORY',
+)
+
+# Сколько параметров подставлять в один запрос вида "WHERE x IN (...)"
+SQL_IN_CHUNK_SIZE = 500
+
+# Сколько символов полного текста показывать в отчете, если нет краткого описания
+REPORT_TEXT_LENGTH = 100
+
+# Колонки, доступные в iter_points: имя -> выражение SQL
+POINT_COLUMNS = {
+    'point_id': 'p.id',
+    'point_number': 'p.point_number',
+    'tag': 'p.tag',
+    'seconds': 'p.seconds',
+    'content': 'p.content',
+    'short_content': 'p.short_content',
+    'created_at': 'p.created_at',
+    'file_id': 'f.id',
+    'filename': 'f.filename',
+    'file_path': 'f.file_path',
+    'folder': 'f.folder',
+    'broadcast_at': 'f.broadcast_at',
+    'broadcast_month': 'substr(f.broadcast_at, 1, 7)',
+    # Текст пункта для отчетов: краткое описание, если есть, иначе начало
+    # полного текста (сам полный текст из базы не читается)
+    'display_text': f'''COALESCE(NULLIF(p.short_content, ''),
+                               CASE WHEN length(p.content) > {REPORT_TEXT_LENGTH}
+                                    THEN substr(p.content, 1, {REPORT_TEXT_LENGTH}) || '...'
+                                    ELSE p.content END)''',
+}
+POINT_COLUMN_NAMES = tuple(POINT_COLUMNS)
+
+# Сколько строк читать из курсора за раз при потоковой выборке
+FETCH_BATCH_SIZE = 500
+
+# Порог коротких пунктов по умолчанию (reports.min_duration_seconds в config.yaml)
+DEFAULT_MIN_DURATION_SECONDS = 30
+
+# Сколько секунд persist ждет, пока другие соединения отпустят блокировку базы
+PERSIST_BUSY_TIMEOUT = 30
+
+# Каталог баз данных: по одной базе на папку месяца (ИЮЛЬ -> databases/ИЮЛЬ.db)
+DATABASES_DIR = "databases"
+
+# Единая база прежних версий (содержит данные одного месяца)
+LEGACY_DATABASE_PATH = "points_database.db"
+
+def month_database_path(month, databases_dir=DATABASES_DIR):
+    """Путь к базе данных месяца"""
+    return str(Path(databases_dir) / f"{month}.db")
+
+def current_month():
+    """Месяц, с которым работает программа: имя папки folder_path из config.yaml"""
+    try:
+        with open('config.yaml', 'r', encoding='utf-8') as file:
+            config = yaml.safe_load(file) or {}
+            return Path(config.get('folder_path', 'ИЮЛЬ')).name
+    except Exception:
+        return 'ИЮЛЬ'
+
+def adopt_legacy_database(db_path):
+    """Переносит единую базу прежних версий на место базы месяца db_path.
+    
+    Срабатывает один раз: если базы месяца еще нет, а старая points_database.db есть.
+    """
+    if os.path.exists(db_path) or not os.path.exists(LEGACY_DATABASE_PATH):
+        return False
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(LEGACY_DATABASE_PATH + suffix):
+            os.replace(LEGACY_DATABASE_PATH + suffix, db_path + suffix)
+    print(f"📦 База {LEGACY_DATABASE_PATH} перенесена в {db_path}")
+    return True
+
+# Папка для файлов, лежащих прямо в корне (в отчеты не попадают)
+ROOT_FOLDER = "Корень"
+
+def folder_name_from_path(file_path):
+    """Папка файла - предпоследняя часть пути (ИЮЛЬ/КП/файл.txt -> КП)"""
+    path_parts = Path(file_path).parts
+    return path_parts[-2] if len(path_parts) >= 2 else ROOT_FOLDER
+
+def read_report_year():
+    """Читает год выхода в эфир из config.yaml (reports.year), по умолчанию - текущий"""
+    try:
+        with open('config.yaml', 'r', encoding='utf-8') as file:
+            config = yaml.safe_load(file) or {}
+            return int((config.get('reports', {}) or {}).get('year', datetime.now().year))
+    except Exception:
+        return datetime.now().year
+
+# Дата и время выхода в эфир в имени файла: "02.07 на 11-00 1.txt"
+# (день и час - 1-2 цифры), иначе только дата: "02.07.txt"
+_BROADCAST_DATETIME_RE = re.compile(r'(\d{1,2})\.(\d{2})\s+на\s+(\d{1,2})-(\d{2})\D?')
+_BROADCAST_DATE_RE = re.compile(r'(\d{1,2})\.(\d{2})')
+
+def parse_broadcast_at(filename, year):
+    """Дата выхода в эфир из имени файла в виде 'ГГГГ-ММ-ДД ЧЧ:ММ' или 'ГГГГ-ММ-ДД'.
+    
+    Такие строки сортируются в хронологическом порядке (файл без времени
+    идет первым в своем дне). Возвращает None, если даты в имени нет или
+    она некорректна.
+    """
+    match = _BROADCAST_DATETIME_RE.search(filename)
+    if match:
+        day, month, hour, minute = match.groups()
+        try:
+            return datetime(int(year), int(month), int(day), int(hour), int(minute)).strftime('%Y-%m-%d %H:%M')
+        except ValueError:
+            return None
+    match = _BROADCAST_DATE_RE.search(filename)
+    if match:
+        day, month = match.groups()
+        try:
+            return datetime(int(year), int(month), int(day)).strftime('%Y-%m-%d')
+        except ValueError:
+            return None
+    return None
+
+# Слова поискового запроса (буквы и цифры, в том числе кириллица)
+_SEARCH_WORD_RE = re.compile(r'\w+')
+
+def build_fts_query(query):
+    """Превращает запрос пользователя в выражение FTS5 MATCH.
+    
+    Каждое слово ищется по началу ("новост" найдет "новости", "новостной"),
+    все слова должны встретиться в пункте. Служебный синтаксис FTS5 в
+    запросе не интерпретируется. Возвращает None, если слов нет.
+    """
+    words = _SEARCH_WORD_RE.findall(query)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words).replace('ё', 'е').replace('Ё', 'Е')
+
+def points_filter_conditions(folder=None, tag=None, tag_like=None, min_duration=None,
+                             date_from=None, date_to=None, without_short_content=False):
+    """Условия и параметры выборки пунктов (p - points, f - files; см. iter_points)"""
+    conditions = []
+    params = []
+    if folder is not None:
+        conditions.append('f.folder = ?')
+        params.append(folder)
+    if tag is not None:
+        conditions.append('p.tag = ?')
+        params.append(tag)
+    if tag_like is not None:
+        conditions.append('LOWER(p.tag) LIKE LOWER(?)')
+        params.append(f'%{tag_like}%')
+    if min_duration is not None:
+        # Минимальная длительность действует ТОЛЬКО для тега 'губер'
+        conditions.append("(p.tag != 'губер' OR p.seconds >= ?)")
+        params.append(min_duration)
+    if date_from:
+        conditions.append('f.broadcast_at >= ?')
+        params.append(date_from)
+    if date_to:
+        conditions.append("f.broadcast_at < date(?, '+1 day')")
+        params.append(date_to)
+    if without_short_content:
+        conditions.append("(p.short_content IS NULL OR LENGTH(TRIM(p.short_content)) = 0)")
+    return conditions, params
+
+def rollup_filter_conditions(folder=None, tag=None, date_from=None, date_to=None):
+    """Условия и параметры выборки из points_rollup (см. get_rollup)"""
+    conditions = []
+    params = []
+    for column, value in (('folder', folder), ('tag', tag)):
+        if value is not None:
+            conditions.append(f'{column} = ?')
+            params.append(value)
+    if date_from is not None:
+        conditions.append("day >= ? AND day != ''")
+        params.append(date_from)
+    if date_to is not None:
+        conditions.append("day <= ? AND day != ''")
+        params.append(date_to)
+    return conditions, params
+
+def where_sql(conditions):
+    """WHERE из списка условий (пустая строка, если условий нет)"""
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+def delete_database_files(db_path):
+    """Удаляет файл базы данных вместе с файлами журнала WAL"""
+    for path in (db_path, f"{db_path}-wal", f"{db_path}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+def _add_missing_columns(cursor, table, columns):
+    """Добавляет в таблицу недостающие колонки (базы, созданные до учета версий)"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    existing_columns = {row[1] for row in cursor.fetchall()}
+    for column, column_type in columns:
+        if column not in existing_columns:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+
+def _migrate_initial_schema(cursor):
+    """Исходные таблицы файлов и пунктов"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            filename TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            file_type TEXT,
+            encoding TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS points (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file_id INTEGER,
+            point_number INTEGER,
+            tag TEXT,
+            seconds INTEGER,
+            content TEXT,
+            short_content TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (file_id) REFERENCES files (id)
+        )
+    ''')
+
+def _migrate_file_state(cursor):
+    """Размер, mtime и хэш файла для инкрементальной загрузки"""
+    _add_missing_columns(cursor, 'files', (('file_size', 'INTEGER'),
+                                           ('file_mtime', 'INTEGER'),
+                                           ('content_hash', 'TEXT')))
+
+def _migrate_unique_file_path(cursor):
+    """Уникальный путь файла - ключ для UPSERT в _save_file"""
+    # Сначала убираем возможные дубликаты путей и их пункты
+    cursor.execute('''
+        DELETE FROM files
+        WHERE id NOT IN (SELECT MIN(id) FROM files GROUP BY file_path)
+    ''')
+    cursor.execute('''
+        DELETE FROM points WHERE file_id NOT IN (SELECT id FROM files)
+    ''')
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_files_file_path
+        ON files (file_path)
+    ''')
+
+def _migrate_folder_and_indexes(cursor):
+    """Колонка папки файла и индексы для отчетов"""
+    _add_missing_columns(cursor, 'files', (('folder', 'TEXT'),))
+    
+    # Заполняем папку у уже загруженных файлов
+    cursor.execute('SELECT id, file_path FROM files WHERE folder IS NULL')
+    cursor.executemany('UPDATE files SET folder = ? WHERE id = ?', [
+        (folder_name_from_path(file_path), file_id)
+        for file_id, file_path in cursor.fetchall()
+    ])
+    
+    # Выборка по папке, пунктов файла и по тегу
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_files_folder ON files (folder)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_points_file_id ON points (file_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_points_tag_seconds ON points (tag, seconds)')
+
+def _fts_text(column):
+    """SQL-выражение текста для полнотекстового индекса: "ё" заменяется на "е".
+    
+    Токенизатор unicode61 не считает "ё" буквой с диакритикой, поэтому
+    замена делается при индексации и в запросе (build_fts_query). Число
+    слов не меняется, так что подсветка фрагментов остается точной.
+    """
+    return f"replace(replace({column}, 'ё', 'е'), 'Ё', 'Е')"
+
+def _migrate_points_fts(cursor):
+    """Полнотекстовый индекс по тексту пунктов и кратким описаниям"""
+    # Внешнее содержимое (content='points'): текст хранится только в points,
+    # индекс синхронизируют триггеры. unicode61 приводит кириллицу к нижнему
+    # регистру; индексы префиксов ускоряют поиск по началу слова, которым
+    # заменяется морфология
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS points_fts USING fts5(
+            content,
+            short_content,
+            content='points',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='3 5'
+        )
+    ''')
+    
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS points_fts_insert AFTER INSERT ON points BEGIN
+            INSERT INTO points_fts (rowid, content, short_content)
+            VALUES (new.id, {_fts_text('new.content')}, {_fts_text('new.short_content')});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS points_fts_delete AFTER DELETE ON points BEGIN
+            INSERT INTO points_fts (points_fts, rowid, content, short_content)
+            VALUES ('delete', old.id, {_fts_text('old.content')}, {_fts_text('old.short_content')});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS points_fts_update AFTER UPDATE OF content, short_content ON points BEGIN
+            INSERT INTO points_fts (points_fts, rowid, content, short_content)
+            VALUES ('delete', old.id, {_fts_text('old.content')}, {_fts_text('old.short_content')});
+            INSERT INTO points_fts (rowid, content, short_content)
+            VALUES (new.id, {_fts_text('new.content')}, {_fts_text('new.short_content')});
+        END
+    ''')
+    
+    # Индексируем уже загруженные пункты
+    cursor.execute(f'''
+        INSERT INTO points_fts (rowid, content, short_content)
+        SELECT id, {_fts_text('content')}, {_fts_text('short_content')} FROM points
+    ''')
+
+def _migrate_broadcast_at(cursor):
+    """Дата выхода в эфир, разобранная из имени файла при загрузке"""
+    _add_missing_columns(cursor, 'files', (('broadcast_at', 'TEXT'),))
+    
+    # Для уже загруженных файлов год тот же, что и при загрузке (reports.year)
+    year = read_report_year()
+    cursor.execute('SELECT id, filename FROM files WHERE broadcast_at IS NULL')
+    cursor.executemany('UPDATE files SET broadcast_at = ? WHERE id = ?', [
+        (parse_broadcast_at(filename, year), file_id)
+        for file_id, filename in cursor.fetchall()
+    ])
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_files_broadcast_at ON files (broadcast_at)')
+
+# День группы сводки: дата выхода в эфир файла ('' - дата неизвестна)
+_ROLLUP_DAY_SQL = "COALESCE(substr({files}.broadcast_at, 1, 10), '')"
+
+def _rollup_upsert_sql(select_sql):
+    """Прибавляет к сводке строки select_sql (ключ и приращения счетчиков)"""
+    return f'''
+        INSERT INTO points_rollup (folder, tag, day, points_count, total_seconds,
+                                   short_count, short_seconds)
+        {select_sql}
+        ON CONFLICT (folder, tag, day) DO UPDATE
+        SET points_count = points_count + excluded.points_count,
+            total_seconds = total_seconds + excluded.total_seconds,
+            short_count = short_count + excluded.short_count,
+            short_seconds = short_seconds + excluded.short_seconds
+    '''
+
+def _rollup_point_sql(row, sign):
+    """Изменение сводки на один пункт (row - new или old в триггере)"""
+    seconds = f"COALESCE({row}.seconds, 0)"
+    is_short = f"({seconds} < s.min_duration_seconds)"
+    return _rollup_upsert_sql(f'''
+        SELECT f.folder, {row}.tag, {_ROLLUP_DAY_SQL.format(files='f')},
+               {sign}, {sign} * {seconds},
+               {sign} * {is_short}, {sign} * {is_short} * {seconds}
+        FROM files f, rollup_settings s
+        WHERE f.id = {row}.file_id
+    ''')
+
+def _rollup_file_sql(row, sign):
+    """Изменение сводки на все пункты файла (row - new или old в триггере files)"""
+    seconds = "COALESCE(p.seconds, 0)"
+    is_short = f"({seconds} < s.min_duration_seconds)"
+    return _rollup_upsert_sql(f'''
+        SELECT {row}.folder, p.tag, {_ROLLUP_DAY_SQL.format(files=row)},
+               {sign} * COUNT(*), {sign} * SUM({seconds}),
+               {sign} * SUM({is_short}), {sign} * SUM({is_short} * {seconds})
+        FROM points p, rollup_settings s
+        WHERE p.file_id = {row}.id
+        GROUP BY p.tag
+    ''')
+
+# Пересчет сводки целиком (после смены порога min_duration_seconds)
+_ROLLUP_REBUILD_SQL = f'''
+    INSERT INTO points_rollup (folder, tag, day, points_count, total_seconds,
+                               short_count, short_seconds)
+    SELECT f.folder, p.tag, {_ROLLUP_DAY_SQL.format(files='f')},
+           COUNT(*), SUM(COALESCE(p.seconds, 0)),
+           SUM(COALESCE(p.seconds, 0) < s.min_duration_seconds),
+           SUM((COALESCE(p.seconds, 0) < s.min_duration_seconds) * COALESCE(p.seconds, 0))
+    FROM points p
+    JOIN files f ON p.file_id = f.id
+    CROSS JOIN rollup_settings s
+    GROUP BY 1, 2, 3
+'''
+
+def _migrate_points_rollup(cursor):
+    """Сводка по (папка, тег, день), которую поддерживают триггеры"""
+    # Порог "коротких" пунктов (min_duration_seconds из config.yaml), одна строка
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS rollup_settings (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            min_duration_seconds INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO rollup_settings (id, min_duration_seconds) VALUES (1, ?)
+    ''', (DEFAULT_MIN_DURATION_SECONDS,))
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS points_rollup (
+            folder TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            day TEXT NOT NULL,
+            points_count INTEGER NOT NULL,
+            total_seconds INTEGER NOT NULL,
+            short_count INTEGER NOT NULL,
+            short_seconds INTEGER NOT NULL,
+            PRIMARY KEY (folder, tag, day)
+        ) WITHOUT ROWID
+    ''')
+    
+    # Пустые группы удаляются, чтобы сводка содержала только реальные данные
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS points_rollup_insert AFTER INSERT ON points BEGIN
+            {_rollup_point_sql('new', 1)};
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS points_rollup_delete AFTER DELETE ON points BEGIN
+            {_rollup_point_sql('old', -1)};
+            DELETE FROM points_rollup WHERE points_count = 0 AND tag = old.tag
+              AND (folder, day) IN (SELECT folder, {_ROLLUP_DAY_SQL.format(files='files')}
+                                    FROM files WHERE id = old.file_id);
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS points_rollup_update
+        AFTER UPDATE OF file_id, tag, seconds ON points BEGIN
+            {_rollup_point_sql('old', -1)};
+            {_rollup_point_sql('new', 1)};
+            DELETE FROM points_rollup WHERE points_count = 0 AND tag = old.tag
+              AND (folder, day) IN (SELECT folder, {_ROLLUP_DAY_SQL.format(files='files')}
+                                    FROM files WHERE id = old.file_id);
+        END
+    ''')
+    
+    # Смена папки или даты файла переносит его пункты в другие группы
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS files_rollup_update
+        AFTER UPDATE OF folder, broadcast_at ON files
+        WHEN old.folder IS NOT new.folder OR old.broadcast_at IS NOT new.broadcast_at BEGIN
+            {_rollup_file_sql('old', -1)};
+            {_rollup_file_sql('new', 1)};
+            DELETE FROM points_rollup WHERE points_count = 0
+              AND folder = old.folder AND day = {_ROLLUP_DAY_SQL.format(files='old')};
+        END
+    ''')
+    
+    cursor.execute('DELETE FROM points_rollup')
+    cursor.execute(_ROLLUP_REBUILD_SQL)
+
+# Шаги миграции схемы по порядку: (версия, описание, функция).
+# Новые изменения схемы добавляются только в конец списка новой версией;
+# уже выпущенные шаги не меняются. Шаги должны выдерживать базы, созданные
+# до появления учета версий (CREATE ... IF NOT EXISTS, проверка колонок)
+MIGRATIONS = (
+    (1, 'Таблицы файлов и пунктов', _migrate_initial_schema),
+    (2, 'Состояние файла для инкрементальной загрузки', _migrate_file_state),
+    (3, 'Уникальный путь файла', _migrate_unique_file_path),
+    (4, 'Папка файла и индексы отчетов', _migrate_folder_and_indexes),
+    (5, 'Полнотекстовый поиск по пунктам', _migrate_points_fts),
+    (6, 'Дата выхода в эфир файла', _migrate_broadcast_at),
+    (7, 'Сводка по папкам, тегам и дням', _migrate_points_rollup),
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
 
 class DatabaseManager:
-    def __init__(self, db_path="points_database.db"):
-        """Инициализация менеджера базы данных"""
+    def __init__(self, db_path=None):
+        """Инициализация менеджера базы данных.
+        
+        Без db_path открывается база текущего месяца (см. current_month).
+        Менеджер держит одно соединение на все время работы; его можно
+        использовать как контекстный менеджер (with DatabaseManager() as db),
+        тогда соединение закрывается на выходе.
+        """
+        default_path = db_path is None
+        if default_path:
+            db_path = month_database_path(current_month())
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        if default_path:
+            adopt_legacy_database(db_path)
         self.db_path = db_path
+        self._conn = None
+        self._transaction_depth = 0
         self.init_database()
     
+    @property
+    def conn(self):
+        """Открытое соединение с базой (открывается при первом обращении)"""
+        if self._conn is None:
+            # isolation_level=None: транзакциями управляет transaction()
+            self._conn = sqlite3.connect(self.db_path, isolation_level=None)
+            for pragma in CONNECTION_PRAGMAS:
+                self._conn.execute(pragma)
+        return self._conn
+    
+    def close(self):
+        """Закрывает соединение с базой данных"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+            self._transaction_depth = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    @contextlib.contextmanager
+    def transaction(self):
+        """Область транзакции: фиксация при выходе, откат при исключении.
+        
+        Вложенные вызовы становятся точками сохранения (SAVEPOINT), поэтому
+        ошибка во вложенной области откатывает только ее, а фиксация на диск
+        происходит один раз - при выходе из внешней области.
+        """
+        conn = self.conn
+        depth = self._transaction_depth
+        savepoint = f"sp_{depth}"
+        conn.execute('BEGIN' if depth == 0 else f'SAVEPOINT {savepoint}')
+        self._transaction_depth += 1
+        try:
+            yield conn
+        except BaseException:
+            self._transaction_depth = depth
+            if depth == 0:
+                conn.execute('ROLLBACK')
+            else:
+                conn.execute(f'ROLLBACK TO {savepoint}')
+                conn.execute(f'RELEASE {savepoint}')
+            raise
+        else:
+            self._transaction_depth = depth
+            conn.execute('COMMIT' if depth == 0 else f'RELEASE {savepoint}')
+    
+    def load_from(self, db_path):
+        """Заменяет содержимое базы копией базы db_path (backup API).
+        
+        Нужна для загрузки в память (DatabaseManager(':memory:')) в
+        инкрементальном режиме; схема копии доводится до текущей версии.
+        """
+        try:
+            source = sqlite3.connect(db_path)
+            try:
+                source.backup(self.conn)
+            finally:
+                source.close()
+            self.init_database()
+            return True
+            
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка загрузки базы {db_path}: {e}")
+            return False
+    
+    def persist(self, db_path):
+        """Сохраняет базу в файл db_path одним проходом backup API.
+        
+        Новая база пишется во временный файл рядом и встает на место
+        атомарным переименованием. Если база уже есть, ее могут в это время
+        читать другие соединения (поиск, просмотр), поэтому файл не
+        подменяется: backup переписывает ее одной транзакцией. В обоих
+        случаях сбой оставляет прежнюю базу нетронутой. Возвращает True
+        при успехе.
+        """
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        
+        if os.path.exists(db_path):
+            try:
+                with contextlib.closing(sqlite3.connect(db_path, timeout=PERSIST_BUSY_TIMEOUT)) as target:
+                    self.conn.backup(target)
+                return True
+                
+            except sqlite3.Error as e:
+                print(f"❌ Ошибка сохранения базы {db_path}: {e}")
+                return False
+        
+        temp_path = f"{db_path}.tmp"
+        try:
+            delete_database_files(temp_path)
+            with contextlib.closing(sqlite3.connect(temp_path)) as target:
+                self.conn.backup(target)
+            os.replace(temp_path, db_path)
+            return True
+            
+        except (sqlite3.Error, OSError) as e:
+            print(f"❌ Ошибка сохранения базы {db_path}: {e}")
+            delete_database_files(temp_path)
+            return False
+    
     def init_database(self):
-        """Создает таблицы в базе данных"""
+        """Создает таблицы и доводит схему базы до текущей версии.
+        
+        Применяются только еще не выполненные шаги MIGRATIONS, поэтому
+        обновление схемы не требует удаления базы и повторной загрузки
+        (и повторного сокращения пунктов через GPT).
+        """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.transaction() as conn:
                 cursor = conn.cursor()
                 
-                # Создаем таблицу для файлов
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS files (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        filename TEXT NOT NULL,
-                        file_path TEXT NOT NULL,
-                        file_type TEXT,
-                        encoding TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                # Создаем таблицу для пунктов
                 cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS points (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        file_id INTEGER,
-                        point_number INTEGER,
-                        tag TEXT,
-                        seconds INTEGER,
-                        content TEXT,
-                        short_content TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (file_id) REFERENCES files (id)
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        version INTEGER PRIMARY KEY,
+                        description TEXT,
+                        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
                 ''')
+                cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version')
+                current_version = cursor.fetchone()[0]
                 
-
+                if current_version > SCHEMA_VERSION:
+                    print(f"⚠️ Версия схемы базы ({current_version}) новее программы ({SCHEMA_VERSION})")
                 
-                conn.commit()
+                for version, description, migrate in MIGRATIONS:
+                    if version <= current_version:
+                        continue
+                    migrate(cursor)
+                    cursor.execute('''
+                        INSERT INTO schema_version (version, description) VALUES (?, ?)
+                    ''', (version, description))
+                    if current_version:
+                        print(f"🔧 Миграция базы {version}: {description}")
                 
         except sqlite3.Error as e:
             print(f"❌ Ошибка создания базы данных: {e}")
     
-    def save_file(self, filename, file_path, file_type, encoding):
+    def _save_file(self, cursor, file):
+        """Сохраняет файл (FileRecord) в рамках открытой транзакции и возвращает его ID"""
+        # Один запрос вместо SELECT + UPDATE/INSERT: конфликт по уникальному
+        # file_path превращает вставку в обновление существующей строки
+        cursor.execute('''
+            INSERT INTO files (filename, file_path, folder, file_type, encoding,
+                               file_size, file_mtime, content_hash, broadcast_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (file_path) DO UPDATE
+            SET filename = excluded.filename, folder = excluded.folder,
+                broadcast_at = excluded.broadcast_at, file_type = excluded.file_type,
+                encoding = excluded.encoding, file_size = excluded.file_size,
+                file_mtime = excluded.file_mtime, content_hash = excluded.content_hash,
+                created_at = CURRENT_TIMESTAMP
+            RETURNING id
+        ''', (file.filename, str(file.file_path), folder_name_from_path(file.file_path),
+              file.file_type, file.encoding, file.file_size, file.file_mtime,
+              file.content_hash, file.broadcast_at))
+        return cursor.fetchone()[0]
+    
+    def _save_points(self, cursor, points_by_file):
+        """Заменяет пункты нескольких файлов в рамках открытой транзакции.
+        
+        points_by_file - словарь {file_id: список Point}. Старые пункты
+        удаляются и новые вставляются пачками через executemany.
+        """
+        file_ids = list(points_by_file)
+        
+        # Запоминаем уже полученные краткие описания, чтобы не отправлять
+        # неизменившиеся пункты в GPT повторно
+        known_short_content = {}
+        for start in range(0, len(file_ids), SQL_IN_CHUNK_SIZE):
+            chunk = file_ids[start:start + SQL_IN_CHUNK_SIZE]
+            cursor.execute(f'''
+                SELECT file_id, content, short_content FROM points
+                WHERE file_id IN ({', '.join('?' * len(chunk))})
+                  AND short_content IS NOT NULL AND short_content != ''
+            ''', chunk)
+            for file_id, content, short_content in cursor.fetchall():
+                known_short_content[(file_id, content)] = short_content
+        
+        # Удаляем старые пункты этих файлов
+        cursor.executemany('DELETE FROM points WHERE file_id = ?',
+                           [(file_id,) for file_id in file_ids])
+        
+        # Сохраняем новые пункты
+        cursor.executemany('''
+            INSERT INTO points (file_id, point_number, tag, seconds, content, short_content)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [
+            (
+                file_id,
+                i,
+                point.tag,
+                point.seconds,
+                point.value,
+                point.short_content or known_short_content.get((file_id, point.value), '')
+            )
+            for file_id, points in points_by_file.items()
+            for i, point in enumerate(points, 1)
+        ])
+    
+    def save_file(self, filename, file_path, file_type, encoding,
+                  file_size=None, file_mtime=None, content_hash=None, broadcast_at=None):
         """Сохраняет информацию о файле и возвращает его ID"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.transaction() as conn:
                 cursor = conn.cursor()
                 
-                # Проверяем, существует ли уже такой файл
-                cursor.execute('''
-                    SELECT id FROM files WHERE file_path = ?
-                ''', (str(file_path),))
-                
-                existing_file = cursor.fetchone()
-                
-                if existing_file:
-                    # Обновляем существующий файл
-                    cursor.execute('''
-                        UPDATE files 
-                        SET filename = ?, file_type = ?, encoding = ?, created_at = CURRENT_TIMESTAMP
-                        WHERE id = ?
-                    ''', (filename, file_type, encoding, existing_file[0]))
-                    file_id = existing_file[0]
-                else:
-                    # Создаем новый файл
-                    cursor.execute('''
-                        INSERT INTO files (filename, file_path, file_type, encoding)
-                        VALUES (?, ?, ?, ?)
-                    ''', (filename, str(file_path), file_type, encoding))
-                    file_id = cursor.lastrowid
-                
-                conn.commit()
+                file_id = self._save_file(cursor, FileRecord(
+                    filename, file_path, file_type, encoding,
+                    file_size, file_mtime, content_hash, broadcast_at))
                 return file_id
                 
         except sqlite3.Error as e:
@@ -93,40 +724,62 @@ class DatabaseManager:
             return None
     
     def save_points(self, file_id, points):
-        """Сохраняет пункты для указанного файла"""
-        if not points:
-            return
-        
+        """Сохраняет пункты (Point) для указанного файла (пустой список очищает старые пункты)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.transaction() as conn:
                 cursor = conn.cursor()
                 
-                # Удаляем старые пункты для этого файла
-                cursor.execute('DELETE FROM points WHERE file_id = ?', (file_id,))
+                self._save_points(cursor, {file_id: points})
                 
-                # Сохраняем новые пункты
-                for i, point in enumerate(points, 1):
-                    cursor.execute('''
-                        INSERT INTO points (file_id, point_number, tag, seconds, content, short_content)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (
-                        file_id,
-                        i,
-                        point.get('tag', ''),
-                        point.get('seconds', 0),
-                        point.get('value', ''),
-                        point.get('short_content', '')  # Добавляем короткое описание
-                    ))
-                
-                conn.commit()
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка сохранения пунктов: {e}")
+    
+    def save_points_bulk(self, points_by_file):
+        """Сохраняет пункты сразу многих файлов: {file_id: список Point}"""
+        try:
+            with self.transaction() as conn:
+                cursor = conn.cursor()
+                
+                self._save_points(cursor, points_by_file)
                 
         except sqlite3.Error as e:
             print(f"❌ Ошибка сохранения пунктов: {e}")
     
+    def save_batch(self, parsed_files, touched_files=()):
+        """Сохраняет пачку файлов одной транзакцией.
+        
+        parsed_files - список пар (FileRecord, список Point);
+        touched_files - кортежи (file_id, file_size, file_mtime) файлов, у которых
+        изменились только размер/mtime. Возвращает список ID сохраненных файлов
+        (None для всех при ошибке - транзакция откатывается целиком).
+        """
+        try:
+            with self.transaction() as conn:
+                cursor = conn.cursor()
+                
+                file_ids = [self._save_file(cursor, file)
+                            for file, _ in parsed_files]
+                self._save_points(cursor, {
+                    file_id: points
+                    for file_id, (_, points) in zip(file_ids, parsed_files)
+                })
+                
+                cursor.executemany('''
+                    UPDATE files 
+                    SET file_size = ?, file_mtime = ?
+                    WHERE id = ?
+                ''', [(file_size, file_mtime, file_id)
+                      for file_id, file_size, file_mtime in touched_files])
+                return file_ids
+                
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка сохранения пачки файлов: {e}")
+            return [None] * len(parsed_files)
+    
     def update_point_short_content(self, point_id, short_content):
         """Обновляет короткое описание пункта"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.transaction() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -134,39 +787,206 @@ class DatabaseManager:
                     SET short_content = ? 
                     WHERE id = ?
                 ''', (short_content, point_id))
-                
-                conn.commit()
                 return True
                 
         except sqlite3.Error as e:
             print(f"❌ Ошибка обновления короткого описания: {e}")
             return False
     
+    def iter_points(self, columns=POINT_COLUMN_NAMES, order_by=('filename', 'point_number'),
+                    batch_size=FETCH_BATCH_SIZE, **filters):
+        """Перебирает пункты, не загружая всю выборку в память.
+        
+        columns - имена колонок из POINT_COLUMNS, которые попадут в строку
+        (в этом порядке); order_by - имена колонок для сортировки. Фильтры:
+        folder, tag, tag_like (подстрока тега без учета регистра),
+        min_duration (порог для тега 'губер'), date_from/date_to (дата
+        выхода в эфир 'ГГГГ-ММ-ДД', включительно), without_short_content.
+        Строки - именованные кортежи с полями columns (point.tag, point.seconds...),
+        читаются пачками по batch_size через fetchmany.
+        """
+        select_sql = ',\n                    '.join(POINT_COLUMNS[column] for column in columns)
+        order_sql = ', '.join(POINT_COLUMNS[column] for column in order_by)
+        conditions, params = points_filter_conditions(**filters)
+        where = where_sql(conditions)
+        
+        try:
+            cursor = self.conn.cursor()
+            cursor.row_factory = row_factory(point_row_type(tuple(columns)))
+            
+            cursor.execute(f'''
+                SELECT 
+                    {select_sql}
+                FROM points p
+                JOIN files f ON p.file_id = f.id
+                {where}
+                ORDER BY {order_sql}
+            ''', params)
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+            
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка получения пунктов: {e}")
+    
+    def count_points(self, **filters):
+        """Число пунктов, подходящих под фильтры iter_points"""
+        conditions, params = points_filter_conditions(**filters)
+        where = where_sql(conditions)
+        
+        try:
+            cursor = self.conn.cursor()
+            
+            cursor.execute(f'''
+                SELECT COUNT(*)
+                FROM points p
+                JOIN files f ON p.file_id = f.id
+                {where}
+            ''', params)
+            
+            return cursor.fetchone()[0]
+            
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка подсчета пунктов: {e}")
+            return 0
+    
     def get_all_points(self):
-        """Получает все пункты из базы данных"""
+        """Получает все пункты из базы данных (для больших баз - iter_points)"""
+        return list(self.iter_points(('filename', 'point_number', 'tag', 'seconds', 'content',
+                                      'short_content', 'created_at', 'point_id')))
+    
+    def get_file_states(self):
+        """Возвращает сохраненное состояние всех файлов: {file_path: FileState}"""
+        try:
+            cursor = self.conn.cursor()
+            
+            cursor.execute('''
+                SELECT f.file_path, f.id, f.file_size, f.file_mtime, f.content_hash,
+                       (SELECT COUNT(*) FROM points p WHERE p.file_id = f.id)
+                FROM files f
+            ''')
+            
+            return {row[0]: FileState._make(row[1:]) for row in cursor.fetchall()}
+            
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка получения состояния файлов: {e}")
+            return {}
+    
+    def delete_missing_files(self, existing_paths):
+        """Удаляет файлы (и их пункты), которых больше нет на диске. Возвращает число удаленных"""
+        existing_paths = {str(path) for path in existing_paths}
+        
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.transaction() as conn:
                 cursor = conn.cursor()
                 
-                cursor.execute('''
-                    SELECT 
-                        f.filename,
-                        p.point_number,
-                        p.tag,
-                        p.seconds,
-                        p.content,
-                        p.short_content,
-                        p.created_at,
-                        p.id
-                    FROM points p
-                    JOIN files f ON p.file_id = f.id
-                    ORDER BY f.filename, p.point_number
-                ''')
+                cursor.execute('SELECT id, file_path FROM files')
+                missing_ids = [(file_id,) for file_id, file_path in cursor.fetchall()
+                               if file_path not in existing_paths]
                 
-                return cursor.fetchall()
+                if missing_ids:
+                    cursor.executemany('DELETE FROM points WHERE file_id = ?', missing_ids)
+                    cursor.executemany('DELETE FROM files WHERE id = ?', missing_ids)
+                return len(missing_ids)
                 
         except sqlite3.Error as e:
-            print(f"❌ Ошибка получения пунктов: {e}")
+            print(f"❌ Ошибка удаления отсутствующих файлов: {e}")
+            return 0
+    
+    def set_min_duration_seconds(self, min_duration_seconds):
+        """Задает порог коротких пунктов сводки; при смене порога сводка пересчитывается"""
+        try:
+            with self.transaction() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute('SELECT min_duration_seconds FROM rollup_settings')
+                if cursor.fetchone()[0] == min_duration_seconds:
+                    return
+                cursor.execute('''
+                    UPDATE rollup_settings SET min_duration_seconds = ?
+                ''', (min_duration_seconds,))
+                cursor.execute('DELETE FROM points_rollup')
+                cursor.execute(_ROLLUP_REBUILD_SQL)
+                
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка обновления порога сводки: {e}")
+    
+    def get_rollup(self, folder=None, tag=None, date_from=None, date_to=None):
+        """Сводка по (папка, тег) из points_rollup.
+        
+        Возвращает строки RollupRow (folder, tag, points_count, total_seconds,
+        short_count, short_seconds), упорядоченные по папке и тегу. Короткие -
+        пункты короче порога set_min_duration_seconds. date_from/date_to
+        ('ГГГГ-ММ-ДД', включительно) ограничивают дни выхода в эфир.
+        """
+        conditions, params = rollup_filter_conditions(folder, tag, date_from, date_to)
+        where = where_sql(conditions)
+        
+        try:
+            cursor = self.conn.cursor()
+            
+            cursor.row_factory = row_factory(RollupRow)
+            
+            cursor.execute(f'''
+                SELECT folder, tag, SUM(points_count), SUM(total_seconds),
+                       SUM(short_count), SUM(short_seconds)
+                FROM points_rollup
+                {where}
+                GROUP BY folder, tag
+                ORDER BY folder, tag
+            ''', params)
+            
+            return cursor.fetchall()
+            
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка получения сводки: {e}")
             return []
     
- 
\ No newline at end of file
+    def search_points(self, query, folder=None, tag=None, limit=50):
+        """Полнотекстовый поиск пунктов, лучшие совпадения первыми.
+        
+        Возвращает строки SearchRow (filename, folder, point_number, tag, seconds,
+        content, short_content, snippet), где snippet - фрагмент текста
+        с найденными словами в [скобках]. Можно ограничить поиск папкой
+        и тегом.
+        """
+        match = build_fts_query(query)
+        if match is None:
+            return []
+        
+        conditions, params = points_filter_conditions(folder=folder, tag=tag)
+        conditions.insert(0, 'points_fts MATCH ?')
+        params = [match, *params, limit]
+        
+        try:
+            cursor = self.conn.cursor()
+            
+            cursor.row_factory = row_factory(SearchRow)
+            
+            # bm25: совпадение в кратком описании весит вдвое больше
+            cursor.execute(f'''
+                SELECT 
+                    f.filename,
+                    f.folder,
+                    p.point_number,
+                    p.tag,
+                    p.seconds,
+                    p.content,
+                    p.short_content,
+                    snippet(points_fts, 0, '[', ']', '...', 12)
+                FROM points_fts
+                JOIN points p ON p.id = points_fts.rowid
+                JOIN files f ON p.file_id = f.id
+                {where_sql(conditions)}
+                ORDER BY bm25(points_fts, 1.0, 2.0)
+                LIMIT ?
+            ''', params)
+            
+            return cursor.fetchall()
+            
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка полнотекстового поиска: {e}")
+            return []
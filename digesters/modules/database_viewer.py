@@ -5,11 +5,47 @@
 Показывает все сохраненные пункты и информацию о БД
 """
 
-from modules.database import DatabaseManager
+from modules.database import DatabaseManager, DEFAULT_MIN_DURATION_SECONDS, ROOT_FOLDER, delete_database_files
+from modules.month_databases import MonthDatabases
+from modules.report_template import HEADER_MAX_COLUMN, HEADER_MAX_ROW, ReportTemplate
+from modules.xlsx_writer import save_workbook_with_rows
+from modules.logo_cache import load_logo
 import sqlite3
 import os
+import itertools
+import io
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+import yaml
 import datetime 
 
+def peek_rows(rows):
+    """Возвращает итератор строк или None, если строк нет (первая строка не теряется)"""
+    rows = iter(rows)
+    first_row = next(rows, None)
+    if first_row is None:
+        return None
+    return itertools.chain((first_row,), rows)
+
+def group_report_points(db_manager, group_by, columns, **filters):
+    """Пункты отчета одним упорядоченным запросом, разбитые в памяти по group_by.
+    
+    Возвращает {(значения group_by): [строки iter_points с полями group_by и columns]};
+    внутри группы пункты идут в порядке выхода в эфир. filters - как у iter_points.
+    Все группы держатся в памяти, поэтому отчеты берут короткую колонку
+    display_text, а не полный content.
+    """
+    group_by = tuple(group_by)
+    points = db_manager.iter_points(
+        group_by + tuple(columns),
+        order_by=group_by + ('broadcast_at', 'filename', 'point_number'),
+        **filters)
+    
+    groups = {}
+    for key, rows in itertools.groupby(points, key=lambda point: tuple(getattr(point, name) for name in group_by)):
+        groups[key] = list(rows)
+    return groups
+
 def view_all_points():
     """Показывает все пункты из базы данных"""
     db_manager = DatabaseManager()
@@ -17,26 +53,25 @@ def view_all_points():
     print("📋 ВСЕ ПУНКТЫ ИЗ БАЗЫ ДАННЫХ")
     print("=" * 80)
     
-    points = db_manager.get_all_points()
+    points = peek_rows(db_manager.iter_points(
+        ('filename', 'point_number', 'tag', 'seconds', 'content', 'created_at')))
     
-    if not points:
+    if points is None:
         print("❌ В базе данных нет пунктов")
         return
     
     current_file = None
     for point in points:
-        filename, point_number, tag, seconds, content, created_at = point
-        
         # Показываем имя файла только при смене
-        if current_file != filename:
-            current_file = filename
-            print(f"\n📄 ФАЙЛ: {filename}")
+        if current_file != point.filename:
+            current_file = point.filename
+            print(f"\n📄 ФАЙЛ: {point.filename}")
             print("-" * 60)
         
         # Показываем пункт
-        print(f"📌 Пункт {point_number}: {tag.title()} | {seconds} сек")
-        print(f"📄 Текст: {content[:100]}{'...' if len(content) > 100 else ''}")
-        print(f"⏰ Создан: {created_at}")
+        print(f"📌 Пункт {point.point_number}: {point.tag.title()} | {point.seconds} сек")
+        print(f"📄 Текст: {point.content[:100]}{'...' if len(point.content) > 100 else ''}")
+        print(f"⏰ Создан: {point.created_at}")
         print("-" * 40)
 
 def view_database_info():
@@ -76,8 +111,9 @@ def delete_database():
     print("=" * 40)
     
     try:
+        db_manager.close()
         if os.path.exists(db_manager.db_path):
-            os.remove(db_manager.db_path)
+            delete_database_files(db_manager.db_path)
             print(f"✅ База данных удалена: {db_manager.db_path}")
             print("💡 При следующем запуске анализа будет создана новая БД")
         else:
@@ -92,143 +128,109 @@ def search_points_by_tag(tag):
     print(f"🔍 ПОИСК ПУНКТОВ ПО ТЕГУ: {tag.upper()}")
     print("=" * 60)
     
+    found_count = db_manager.count_points(tag_like=tag)
+    
+    if not found_count:
+        print(f"❌ Пункты с тегом '{tag}' не найдены")
+        return
+    
+    print(f"📊 Найдено пунктов: {found_count}")
+    print("-" * 60)
+    
+    points = db_manager.iter_points(
+        ('filename', 'point_number', 'tag', 'seconds', 'content'),
+        tag_like=tag)
+    
+    current_file = None
+    for point in points:
+        if current_file != point.filename:
+            current_file = point.filename
+            print(f"\n📄 ФАЙЛ: {point.filename}")
+            print("-" * 40)
+        
+        print(f"📌 Пункт {point.point_number}: {point.tag.title()} | {point.seconds} сек")
+        print(f"📄 Текст: {point.content[:80]}{'...' if len(point.content) > 80 else ''}")
+        print("-" * 30)
+
+def search_points(query, folder=None, tag=None, limit=50, months=None):
+    """Полнотекстовый поиск пунктов по тексту и краткому описанию (по всем месяцам или months)"""
+    databases = MonthDatabases()
+    
+    print(f"🔍 ПОИСК ПУНКТОВ: {query}")
+    if folder or tag or months:
+        print(f"🗓️ Месяцы: {', '.join(months) if months else 'все'} | "
+              f"📁 Папка: {folder or 'все'} | 🏷️ Тег: {tag or 'все'}")
+    print("=" * 60)
+    
+    points = databases.search_points(query, months=months, folder=folder, tag=tag, limit=limit)
+    
+    if not points:
+        print(f"❌ Пункты по запросу '{query}' не найдены")
+        return
+    
+    print(f"📊 Найдено пунктов: {len(points)}")
+    print("-" * 60)
+    
+    for point in points:
+        print(f"📄 {point.month}/{point.folder}/{point.filename} | Пункт {point.point_number}: {point.tag.title()} | {point.seconds} сек")
+        if point.short_content:
+            print(f"📝 Кратко: {point.short_content}")
+        print(f"📄 Текст: {point.snippet}")
+        print("-" * 30)
+
+def read_min_duration_seconds():
+    """Читает порог коротких пунктов из config.yaml (reports.min_duration_seconds)"""
     try:
-        with sqlite3.connect(db_manager.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT 
-                    f.filename,
-                    p.point_number,
-                    p.tag,
-                    p.seconds,
-                    p.content,
-                    p.created_at
-                FROM points p
-                JOIN files f ON p.file_id = f.id
-                WHERE LOWER(p.tag) LIKE LOWER(?)
-                ORDER BY f.filename, p.point_number
-            ''', (f'%{tag}%',))
-            
-            points = cursor.fetchall()
-            
-            if not points:
-                print(f"❌ Пункты с тегом '{tag}' не найдены")
-                return
-            
-            print(f"📊 Найдено пунктов: {len(points)}")
-            print("-" * 60)
-            
-            current_file = None
-            for point in points:
-                filename, point_number, point_tag, seconds, content, created_at = point
-                
-                if current_file != filename:
-                    current_file = filename
-                    print(f"\n📄 ФАЙЛ: {filename}")
-                    print("-" * 40)
-                
-                print(f"📌 Пункт {point_number}: {point_tag.title()} | {seconds} сек")
-                print(f"📄 Текст: {content[:80]}{'...' if len(content) > 80 else ''}")
-                print("-" * 30)
-                
-    except sqlite3.Error as e:
-        print(f"❌ Ошибка поиска: {e}")
+        with open('config.yaml', 'r', encoding='utf-8') as file:
+            config = yaml.safe_load(file) or {}
+            return (config.get('reports', {}) or {}).get('min_duration_seconds', DEFAULT_MIN_DURATION_SECONDS)
+    except Exception:
+        return DEFAULT_MIN_DURATION_SECONDS
 
-def get_points_summary():
-    """Показывает краткую сводку по пунктам"""
+def get_points_summary(date_from=None, date_to=None, jobs=1):
+    """Показывает краткую сводку по пунктам и создает отчеты (за период date_from - date_to, в jobs процессах)"""
     db_manager = DatabaseManager()
     
     try:
         with sqlite3.connect(db_manager.db_path) as conn:
             cursor = conn.cursor()
             
+            # Сводка по папкам и тегам (поддерживается триггерами при загрузке)
+            min_duration = read_min_duration_seconds()
+            db_manager.set_min_duration_seconds(min_duration)
+            rollup = db_manager.get_rollup()
+            
             # Общее количество пунктов
-            cursor.execute("SELECT COUNT(*) FROM points")
-            total_points = cursor.fetchone()[0]
+            total_points = sum(row.points_count for row in rollup)
             
             # Количество файлов
             cursor.execute("SELECT COUNT(*) FROM files")
             total_files = cursor.fetchone()[0]
             
-            # Статистика по тегам в разбивке по папкам
-            cursor.execute("""
-                SELECT 
-                    f.file_path,
-                    p.tag, 
-                    COUNT(*) as count
-                FROM points p
-                JOIN files f ON p.file_id = f.id
-                GROUP BY f.file_path, p.tag 
-                ORDER BY f.file_path, p.tag
-            """)
-            folder_tag_stats = cursor.fetchall()
-            
             print(f"📁 Файлов: {total_files}")
             print(f"📋 Пунктов: {total_points}")
             print("🏷️ Статистика по папкам и тегам:")
             
             # Группируем по папкам
             folder_data = {}
-            for file_path, tag, count in folder_tag_stats:
-                # Извлекаем папку из пути
-                from pathlib import Path
-                path_parts = Path(file_path).parts
-                if len(path_parts) >= 2:
-                    folder_name = path_parts[-2]  # Предпоследняя часть пути
-                else:
-                    folder_name = "Корень"
-                
-                if folder_name not in folder_data:
-                    folder_data[folder_name] = {}
-                
-                if tag not in folder_data[folder_name]:
-                    folder_data[folder_name][tag] = 0
-                
-                folder_data[folder_name][tag] += count
+            short_folder_data = {}
+            for row in rollup:
+                folder_data.setdefault(row.folder, {})[row.tag] = row.points_count
+                # Короткие пункты исключаются из отчетов ТОЛЬКО для тега 'губер'
+                if row.tag == 'губер' and row.short_count:
+                    short_folder_data.setdefault(row.folder, {})[row.tag] = row.short_count
             
             for folder_name, tags in folder_data.items():
-                if folder_name != "Корень":
+                if folder_name != ROOT_FOLDER:
                     print(f"  📁 {folder_name}:")
                     for tag, count in tags.items():
                         print(f"    📌 {tag}: {count} пунктов")
             
-            # Проверяем пункты короче 30 секунд ТОЛЬКО для тега 'губер'
-            cursor.execute("""
-                SELECT 
-                    f.file_path,
-                    p.tag, 
-                    COUNT(*) as count
-                FROM points p
-                JOIN files f ON p.file_id = f.id
-                WHERE p.seconds < 30 AND p.tag = 'губер'
-                GROUP BY f.file_path, p.tag 
-                ORDER BY f.file_path, p.tag
-            """)
-            short_points_stats = cursor.fetchall()
-            
-            if short_points_stats:
-                print("⚠️ Пункты 'губер' короче 30 сек (исключены из отчетов):")
-                
-                # Группируем короткие пункты по папкам
-                short_folder_data = {}
-                for file_path, tag, count in short_points_stats:
-                    path_parts = Path(file_path).parts
-                    if len(path_parts) >= 2:
-                        folder_name = path_parts[-2]
-                    else:
-                        folder_name = "Корень"
-                    
-                    if folder_name not in short_folder_data:
-                        short_folder_data[folder_name] = {}
-                    
-                    if tag not in short_folder_data[folder_name]:
-                        short_folder_data[folder_name][tag] = 0
-                    
-                    short_folder_data[folder_name][tag] += count
+            if short_folder_data:
+                print(f"⚠️ Пункты 'губер' короче {min_duration} сек (исключены из отчетов):")
                 
                 for folder_name, tags in short_folder_data.items():
-                    if folder_name != "Корень":
+                    if folder_name != ROOT_FOLDER:
                         print(f"  📁 {folder_name}:")
                         for tag, count in tags.items():
                             print(f"    ⏱️ {tag}: {count} пунктов")
@@ -249,23 +251,117 @@ def get_points_summary():
             
             print("=" * 40)
             print("📊 Создание Excel отчета...")
-            create_excel_report()
+            create_excel_report(date_from, date_to, jobs)
             
     except sqlite3.Error as e:
         print(f"❌ Ошибка получения сводки: {e}")
 
 
-def create_excel_report():
-    """Создает Excel отчет с группировкой по папкам и тегам - каждый тег в отдельном файле, используя шаблон"""
+def format_broadcast_at(broadcast_at, with_year=True):
+    """Дата выхода в эфир для отчета: 'ДД.ММ.ГГГГ ЧЧ:ММ', 'ДД.ММ.ГГГГ' или 'ДД.ММ'"""
+    if not broadcast_at:
+        return "Дата не найдена"
+    date_part, _, time_part = broadcast_at.partition(' ')
+    year, month, day = date_part.split('-')
+    if not with_year:
+        return f"{day}.{month}"
+    formatted = f"{day}.{month}.{year}"
+    return f"{formatted} {time_part}" if time_part else formatted
+
+def build_tag_report(template, excel_filename, rows, total_materials, total_seconds, header, logo_path):
+    """Создает и сохраняет книгу отчета одного тега по шаблону.
+    
+    rows - строки (дата и время выхода в эфир, текст, секунды), header -
+    (год, месяц, Ф.И.О., компания, полное название компании). Функция
+    выполняется и в процессах пула, поэтому ее сообщения не печатаются,
+    а возвращаются строкой - вывод отчетов не перемешивается.
+    """
+    from openpyxl.styles import Border, Side
+    
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        # Копия шаблона
+        wb = template.new_workbook()
+        ws = wb.active
+        
+        # Добавляем логотип в верхний левый угол
+        add_logo_to_report(ws, logo_path)
+        
+        # Заполняем шапку отчета
+        fill_report_header(ws, *header, template.placeholder_cells)
+        
+        if rows:
+            # Начинаем запись данных с 15-й строки (шапка в 14-й)
+            start_row = 15
+            
+            # Создаем бордер для ячеек
+            thin_border = Border(
+                left=Side(style='thin'),
+                right=Side(style='thin'),
+                top=Side(style='thin'),
+                bottom=Side(style='thin')
+            )
+            
+            # Строка-образец: стиль с бордером для ячеек данных и итога (колонки B-E)
+            for col in range(2, 6):  # Колонки B, C, D, E
+                ws.cell(row=start_row, column=col).border = thin_border
+            
+            # Данные начиная со второй колонки (B):
+            # A | B | C | D | E
+            #   | № п/п | Дата и время выхода в эфир | Тема информационного материала | Хронометраж (сек.)
+            data_rows = ((i, broadcast_date_time, display_text, seconds)
+                         for i, (broadcast_date_time, display_text, seconds) in enumerate(rows, 1))
+            
+            # Добавляем итоги в конце без отступа (из сводки)
+            total_minutes = total_seconds // 60
+            total_remaining_seconds = total_seconds % 60
+            total_time = f"{total_minutes} мин {total_remaining_seconds:02d} сек"
+            summary_row = (None, "Итого:", f"{total_materials} информационных материала", total_time)
+            
+            # Строки пишутся прямо в XML листа; ширину колонок НЕ изменяем - сохраняем из шаблона
+            save_workbook_with_rows(wb, excel_filename, start_row, 'BCDE',
+                                    itertools.chain(data_rows, (summary_row,)))
+        else:
+            # Сохраняем Excel файл
+            wb.save(excel_filename)
+        print(f"      ✅ Excel файл создан: {os.path.basename(excel_filename)}")
+    
+    return output.getvalue()
+
+def run_report_jobs(report_jobs, jobs=1):
+    """Выполняет задания отчетов и печатает их вывод в исходном порядке.
+    
+    report_jobs - строки сообщений и кортежи аргументов build_tag_report.
+    При jobs > 1 книги строятся параллельно в пуле из jobs процессов;
+    файлы и вывод от этого не зависят.
+    """
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = [job if isinstance(job, str) else executor.submit(build_tag_report, *job)
+                       for job in report_jobs]
+            for result in results:
+                if isinstance(result, str):
+                    print(result)
+                else:
+                    print(result.result(), end='')
+    else:
+        for job in report_jobs:
+            if isinstance(job, str):
+                print(job)
+            else:
+                print(build_tag_report(*job), end='')
+
+def create_excel_report(date_from=None, date_to=None, jobs=1):
+    """Создает Excel отчет с группировкой по папкам и тегам - каждый тег в отдельном файле, используя шаблон.
+    
+    date_from/date_to ('ГГГГ-ММ-ДД', включительно) ограничивают отчет
+    пунктами, вышедшими в эфир в этом интервале. jobs - число процессов,
+    в которых строятся книги тегов.
+    """
     try:
         import pandas as pd
-        from openpyxl import load_workbook
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-        from openpyxl.utils.dataframe import dataframe_to_rows
-        import re
         import yaml
         from pathlib import Path
-        import os
         
         print("📊 Создание Excel отчета")
         print("=" * 40)
@@ -285,12 +381,12 @@ def create_excel_report():
                 reports_config = config.get('reports', {})
                 export_path = reports_config.get('path', 'reports')
                 year = reports_config.get('year', '2024')
-                min_duration = reports_config.get('min_duration_seconds', 30)
+                min_duration = reports_config.get('min_duration_seconds', DEFAULT_MIN_DURATION_SECONDS)
                 docs_config = reports_config.get('docs', {})
         except:
             export_path = 'reports'
             year = '2024'
-            min_duration = 30
+            min_duration = DEFAULT_MIN_DURATION_SECONDS
             docs_config = {}
         
         # Создаем папку для экспорта, если её нет
@@ -300,6 +396,8 @@ def create_excel_report():
         print(f"📁 Папка экспорта: {export_dir.absolute()}")
         print(f"📅 Год: {year}")
         print(f"⏱️ Минимальная длительность: {min_duration} сек (только для тега 'губер')")
+        if date_from or date_to:
+            print(f"🗓️ Период: {date_from or '...'} - {date_to or '...'}")
         
         # Путь к шаблону
         template_path = Path("../static/template.xlsx")
@@ -309,62 +407,57 @@ def create_excel_report():
         
         print(f"📋 Используем шаблон: {template_path}")
         
+        # Шаблон разбирается один раз, книги тегов - его копии в памяти
+        template = ReportTemplate(template_path)
+        
         db_manager = DatabaseManager()
         
+        # Итоги отчетов по (папка, тег) из сводки; короткие пункты 'губер' не учитываются
+        db_manager.set_min_duration_seconds(min_duration)
+        report_totals = {}
+        for row in db_manager.get_rollup(date_from=date_from, date_to=date_to):
+            if row.tag == 'губер':
+                totals = (row.points_count - row.short_count, row.total_seconds - row.short_seconds)
+            else:
+                totals = (row.points_count, row.total_seconds)
+            report_totals.setdefault(row.folder, {})[row.tag] = totals
+        
+        # Пункты всех отчетов одним запросом, по (папка, тег) в порядке выхода в эфир
+        # (фильтруем по минимальной длительности ТОЛЬКО для 'губер')
+        report_points = group_report_points(
+            db_manager, ('folder', 'tag'), ('broadcast_at', 'seconds', 'display_text'),
+            min_duration=min_duration, date_from=date_from, date_to=date_to)
+        
         # Получаем все файлы с их путями
         with sqlite3.connect(db_manager.db_path) as conn:
             cursor = conn.cursor()
             
-            # Получаем файлы с группировкой по папкам
+            # Получаем папки с файлами (в порядке путей файлов)
             cursor.execute("""
-                SELECT 
-                    filename,
-                    file_path,
-                    file_type,
-                    encoding,
-                    created_at
+                SELECT folder
                 FROM files 
-                ORDER BY file_path
+                GROUP BY folder
+                ORDER BY MIN(file_path)
             """)
             
-            files = cursor.fetchall()
+            folder_names = [row[0] for row in cursor.fetchall()]
             
-            if not files:
+            if not folder_names:
                 print("❌ В базе данных нет файлов для отчета")
                 return False
             
-            # Группируем файлы по папкам
-            folder_groups = {}
-            for file in files:
-                filename, file_path, file_type, encoding, created_at = file
-                
-                # Извлекаем папку из пути (например, ИЮЛЬ/КП/ -> КП)
-                path_parts = Path(file_path).parts
-                if len(path_parts) >= 2:
-                    folder_name = path_parts[-2]  # Берем предпоследнюю часть пути
-                else:
-                    folder_name = "Корень"
-                
-                if folder_name not in folder_groups:
-                    folder_groups[folder_name] = []
-                
-                folder_groups[folder_name].append({
-                    'filename': filename,
-                    'file_path': file_path,
-                    'file_type': file_type,
-                    'encoding': encoding,
-                    'created_at': created_at
-                })
+            # Задания в порядке вывода: сообщения (строки) и книги тегов (аргументы build_tag_report)
+            report_jobs = []
             
             # Создаем папку и Excel файлы для каждой папки
-            for folder_name, folder_files in folder_groups.items():
-                if folder_name == "Корень":
+            for folder_name in folder_names:
+                if folder_name == ROOT_FOLDER:
                     continue  # Пропускаем файлы в корне
                 
-                print(f"\n📁 Обрабатываем папку: {folder_name}")
+                report_jobs.append(f"\n📁 Обрабатываем папку: {folder_name}")
                 
                 # Создаем папку для этой группы
-                folder_dir = export_dir / (folder_name + datetime.now().strftime("_%Y%m%d_%H%M%S"))
+                folder_dir = export_dir / (folder_name + datetime.datetime.now().strftime("_%Y%m%d_%H%M%S"))
                 folder_dir.mkdir(exist_ok=True)
                 
                 # Получаем конфигурацию для этой папки
@@ -374,159 +467,27 @@ def create_excel_report():
                 company_short = folder_config.get('company_short', 'CXXX')
                 company_full = folder_config.get('company_full', 'CFXXX')
                 logo_path = folder_config.get('logo_path', '')
+                header = (year, month, full_name, company_short, company_full)
                 
-                # Получаем все теги для этой папки
-                cursor.execute("""
-                    SELECT DISTINCT p.tag
-                    FROM points p
-                    JOIN files f ON p.file_id = f.id
-                    WHERE f.file_path LIKE ?
-                    ORDER BY p.tag
-                """, (f'%{folder_name}%',))
-                
-                tags = cursor.fetchall()
+                # Теги этой папки с итогами
+                folder_totals = report_totals.get(folder_name, {})
                 
-                # Создаем Excel файл для каждого тега
-                for tag_row in tags:
-                    tag = tag_row[0]
-                    print(f"   🏷️ Создаем файл для тега: {tag}")
-                    
-                    # Создаем Excel файл на основе шаблона
-                    excel_filename = folder_dir / f"{tag}.xlsx"
-                    
-                    # Загружаем шаблон
-                    wb = load_workbook(template_path)
-                    ws = wb.active
-                    
-                    # Добавляем логотип в верхний левый угол
-                    add_logo_to_report(ws, logo_path)
-                    
-                    # Заполняем шапку отчета
-                    fill_report_header(ws, year, month, full_name, company_short, company_full)
-                    
-                    # Получаем пункты для этого тега в этой папке (фильтруем по минимальной длительности ТОЛЬКО для 'губер')
-                    cursor.execute("""
-                        SELECT 
-                            p.point_number,
-                            f.filename,
-                            p.tag,
-                            p.seconds,
-                            p.content,
-                            p.short_content,
-                            p.created_at
-                        FROM points p
-                        JOIN files f ON p.file_id = f.id
-                        WHERE f.file_path LIKE ? AND p.tag = ? AND (p.tag != 'губер' OR p.seconds >= ?)
-                        ORDER BY f.filename, p.point_number
-                    """, (f'%{folder_name}%', tag, min_duration))
-                    
-                    points = cursor.fetchall()
+                # Excel файл для каждого тега
+                for tag, (total_materials, total_seconds) in folder_totals.items():
+                    report_jobs.append(f"   🏷️ Создаем файл для тега: {tag}")
                     
-                    # Сортируем по дате/времени из имени файла (от ранней к поздней)
-                    if points:
-                        from datetime import datetime
-                        def _dt_key(rec):
-                            # rec: (point_number, filename, tag, seconds, content, short_content, created_at)
-                            fn = rec[1]
-                            m = re.search(r'(\d{1,2})\.(\d{2})\s+на\s+(\d{1,2})-(\d{2})\D?', fn)
-                            if m:
-                                d, M, h, m_ = m.groups()
-                                try:
-                                    return datetime(int(year), int(M), int(d), int(h), int(m_))
-                                except:
-                                    return datetime.min
-                            m2 = re.search(r'(\d{1,2})\.(\d{2})', fn)
-                            if m2:
-                                d, M = m2.groups()
-                                try:
-                                    return datetime(int(year), int(M), int(d))
-                                except:
-                                    return datetime.min
-                            return datetime.min
-                        points = sorted(points, key=_dt_key)
+                    # Строки отчета: дата и время выхода в эфир, текст, секунды
+                    # (группа больше не нужна и освобождается)
+                    rows = [(format_broadcast_at(point.broadcast_at), point.display_text, point.seconds)
+                            for point in report_points.pop((folder_name, tag), ())]
                     
-                    if points:
-                        # Начинаем запись данных с 15-й строки (шапка в 14-й)
-                        start_row = 15
-                        
-                        # Создаем бордер для ячеек
-                        thin_border = Border(
-                            left=Side(style='thin'),
-                            right=Side(style='thin'),
-                            top=Side(style='thin'),
-                            bottom=Side(style='thin')
-                        )
-                        
-                        # Данные
-                        row = start_row
-                        total_seconds = 0
-                        for i, point in enumerate(points, 1):
-                            point_number, filename, tag, seconds, content, short_content, created_at = point
-                            
-                            # Извлекаем дату и время из имени файла (поддержка 1-2 цифр дня/часа и возможной буквы после времени)
-                            dt_match = re.search(r'(\d{1,2})\.(\d{2})\s+на\s+(\d{1,2})-(\d{2})\D?', filename)
-                            if dt_match:
-                                d, M, h, m_ = dt_match.groups()
-                                date_part = f"{int(d):02d}.{M}"
-                                time_part = f"{int(h):02d}:{m_}"
-                                broadcast_date_time = f"{date_part}.{year} {time_part}"
-                            else:
-                                d_match = re.search(r'(\d{1,2})\.(\d{2})', filename)
-                                if d_match:
-                                    d, M = d_match.groups()
-                                    date_part = f"{int(d):02d}.{M}"
-                                    broadcast_date_time = f"{date_part}.{year}"
-                                else:
-                                    broadcast_date_time = "Дата не найдена"
-                            
-                            # Используем сокращенный текст, если есть, иначе полный
-                            display_text = short_content if short_content else content[:100] + "..." if len(content) > 100 else content
-                            
-                            # Заполняем данные начиная со второй колонки (B):
-                            # A | B | C | D | E
-                            #   | № п/п | Дата и время выхода в эфир | Тема информационного материала | Хронометраж (мин/сек.)
-                            ws.cell(row=row, column=2, value=i)  # № п/п (колонка B)
-                            ws.cell(row=row, column=3, value=broadcast_date_time)  # Дата и время выхода в эфир (колонка C)
-                            ws.cell(row=row, column=4, value=display_text)  # Тема информационного материала (колонка D)
-                            
-                            # Оставляем секунды как есть
-                            ws.cell(row=row, column=5, value=seconds)  # Хронометраж в секундах (колонка E)
-                            
-                            # Добавляем бордер к каждой ячейке строки данных (колонки B-E)
-                            for col in range(2, 6):  # Колонки B, C, D, E
-                                cell = ws.cell(row=row, column=col)
-                                cell.border = thin_border
-                            
-                            # Суммируем общее время
-                            total_seconds += seconds
-                            
-                            row += 1
-                        
-                        # Добавляем итоги в конце без отступа
-                        total_materials = len(points)
-                        total_minutes = total_seconds // 60
-                        total_remaining_seconds = total_seconds % 60
-                        total_time = f"{total_minutes} мин {total_remaining_seconds:02d} сек"
-                        
-                        # Итоговая строка (без отступа от данных)
-                        summary_row = row  # Сразу после последней строки данных
-                        ws.cell(row=summary_row, column=3, value="Итого:")  # Начинаем с третьего столбца (C)
-                        ws.cell(row=summary_row, column=4, value=f"{total_materials} информационных материала")
-                        ws.cell(row=summary_row, column=5, value=total_time)
-                        
-                        # Добавляем бордер к итоговой строке (колонки B-E)
-                        for col in range(2, 6):  # Колонки B, C, D, E (со второго столбца)
-                            cell = ws.cell(row=summary_row, column=col)
-                            cell.border = thin_border
-                        
-                        # НЕ изменяем ширину колонок - сохраняем из шаблона
-                    
-                    # Сохраняем Excel файл
-                    wb.save(excel_filename)
-                    print(f"      ✅ Excel файл создан: {excel_filename.name}")
+                    report_jobs.append((template, str(folder_dir / f"{tag}.xlsx"), rows,
+                                        total_materials, total_seconds, header, logo_path))
+            
+            run_report_jobs(report_jobs, jobs)
             
             print(f"\n🎉 Создание Excel отчетов завершено!")
-            print(f"📁 Обработано папок: {len(folder_groups)}")
+            print(f"📁 Обработано папок: {len(folder_names)}")
             
             return True
             
@@ -538,30 +499,33 @@ def create_excel_report():
         print(f"❌ Ошибка создания Excel отчета: {e}")
         return False
 
+# Ширина логотипа в отчете, пикселей
+REPORT_LOGO_WIDTH = 150
+
 def add_logo_to_report(ws, logo_path):
     """Добавляет логотип в верхний левый угол отчета с фиксированной шириной 150px"""
     try:
-        from pathlib import Path
-        
-        if not logo_path or not Path(logo_path).exists():
+        # Логотип читается и уменьшается один раз на процесс (см. logo_cache)
+        logo = load_logo(logo_path, REPORT_LOGO_WIDTH) if logo_path else None
+        if logo is None:
             print(f"      ⚠️ Логотип не найден или путь пустой: {logo_path}")
             return
         
         try:
             from openpyxl.drawing.image import Image
             
-            # Создаем объект изображения
-            img = Image(logo_path)
+            # Создаем объект изображения из готовых байтов
+            img = Image(io.BytesIO(logo.data))
             
-            # Получаем оригинальные размеры
-            original_width = img.width
-            original_height = img.height
+            # Получаем оригинальные размеры (файла логотипа, до уменьшения)
+            original_width = logo.original_width or img.width
+            original_height = logo.original_height or img.height
             
             # Вычисляем коэффициент масштабирования для ширины 150px
-            scale_factor = 150 / original_width
+            scale_factor = REPORT_LOGO_WIDTH / original_width
             
             # Устанавливаем фиксированную ширину 150px и пропорциональную высоту
-            img.width = 150
+            img.width = REPORT_LOGO_WIDTH
             img.height = int(original_height * scale_factor)
 
             # Добавляем логотип в ячейку A1 (верхний левый угол)
@@ -579,31 +543,41 @@ def add_logo_to_report(ws, logo_path):
         print(f"      ⚠️ Ошибка добавления логотипа: {e}")
         print(f"      📋 Отчет будет создан без логотипа")
 
-def fill_report_header(ws, year, month, full_name, company_short, company_full):
-    """Заполняет шапку отчета данными из конфигурации"""
+def fill_report_header(ws, year, month, full_name, company_short, company_full, placeholder_cells=None):
+    """Заполняет шапку отчета данными из конфигурации.
+    
+    placeholder_cells - заранее найденные ячейки с плейсхолдерами
+    (ReportTemplate.placeholder_cells); без них просматривается вся шапка.
+    """
     try:
+        if placeholder_cells is None:
+            placeholder_cells = [(row, col)
+                                 for row in range(1, HEADER_MAX_ROW + 1)
+                                 for col in range(1, HEADER_MAX_COLUMN + 1)]
+        
         # Ищем и заменяем плейсхолдеры в шапке
-        for row in range(1, 20):  # Проверяем первые 20 строк
-            for col in range(1, 10):  # Проверяем первые 10 колонок
-                cell = ws.cell(row=row, column=col)
-                if cell.value and isinstance(cell.value, str):
-                    # Заменяем плейсхолдеры
-                    cell.value = cell.value.replace('YXXX', year)
-                    cell.value = cell.value.replace('MXXX', month)
-                    cell.value = cell.value.replace('GXXX', full_name)
-                    cell.value = cell.value.replace('CXXX', company_short)
-                    cell.value = cell.value.replace('CFXXX', company_full)
+        for row, col in placeholder_cells:
+            cell = ws.cell(row=row, column=col)
+            if cell.value and isinstance(cell.value, str):
+                # Заменяем плейсхолдеры
+                cell.value = cell.value.replace('YXXX', year)
+                cell.value = cell.value.replace('MXXX', month)
+                cell.value = cell.value.replace('GXXX', full_name)
+                cell.value = cell.value.replace('CXXX', company_short)
+                cell.value = cell.value.replace('CFXXX', company_full)
     except Exception as e:
         print(f"⚠️ Ошибка заполнения шапки: {e}")
 
 
-def create_simple_excel_report():
-    """Создает простой Excel отчет по папкам без вкладок - все данные в одной таблице"""
+def create_simple_excel_report(date_from=None, date_to=None):
+    """Создает простой Excel отчет по папкам без вкладок - все данные в одной таблице.
+    
+    date_from/date_to ('ГГГГ-ММ-ДД', включительно) ограничивают период выхода в эфир.
+    """
     try:
         import pandas as pd
         from openpyxl import Workbook
         from openpyxl.styles import Font, PatternFill, Alignment
-        import re
         import yaml
         from pathlib import Path
         
@@ -616,10 +590,10 @@ def create_simple_excel_report():
                 config = yaml.safe_load(file)
                 reports_config = config.get('reports', {})
                 export_path = reports_config.get('path', 'reports')
-                min_duration = reports_config.get('min_duration_seconds', 30)
+                min_duration = reports_config.get('min_duration_seconds', DEFAULT_MIN_DURATION_SECONDS)
         except:
             export_path = 'reports'
-            min_duration = 30
+            min_duration = DEFAULT_MIN_DURATION_SECONDS
         
         # Создаем папку для экспорта, если её нет
         export_dir = Path(export_path)
@@ -630,54 +604,33 @@ def create_simple_excel_report():
         
         db_manager = DatabaseManager()
         
+        # Пункты всех папок одним запросом, по папкам в порядке выхода в эфир
+        # (фильтруем по минимальной длительности ТОЛЬКО для 'губер')
+        folder_points = group_report_points(
+            db_manager, ('folder',), ('broadcast_at', 'tag', 'seconds', 'display_text'),
+            min_duration=min_duration, date_from=date_from, date_to=date_to)
+        
         # Получаем все файлы с их путями
         with sqlite3.connect(db_manager.db_path) as conn:
             cursor = conn.cursor()
             
-            # Получаем файлы с группировкой по папкам
+            # Получаем папки с файлами (в порядке путей файлов)
             cursor.execute("""
-                SELECT 
-                    filename,
-                    file_path,
-                    file_type,
-                    encoding,
-                    created_at
+                SELECT folder
                 FROM files 
-                ORDER BY file_path
+                GROUP BY folder
+                ORDER BY MIN(file_path)
             """)
             
-            files = cursor.fetchall()
+            folder_names = [row[0] for row in cursor.fetchall()]
             
-            if not files:
+            if not folder_names:
                 print("❌ В базе данных нет файлов для отчета")
                 return False
             
-            # Группируем файлы по папкам
-            folder_groups = {}
-            for file in files:
-                filename, file_path, file_type, encoding, created_at = file
-                
-                # Извлекаем папку из пути (например, ИЮЛЬ/КП/ -> КП)
-                path_parts = Path(file_path).parts
-                if len(path_parts) >= 2:
-                    folder_name = path_parts[-2]  # Берем предпоследнюю часть пути
-                else:
-                    folder_name = "Корень"
-                
-                if folder_name not in folder_groups:
-                    folder_groups[folder_name] = []
-                
-                folder_groups[folder_name].append({
-                    'filename': filename,
-                    'file_path': file_path,
-                    'file_type': file_type,
-                    'encoding': encoding,
-                    'created_at': created_at
-                })
-            
             # Создаем Excel файл для каждой папки
-            for folder_name, folder_files in folder_groups.items():
-                if folder_name == "Корень":
+            for folder_name in folder_names:
+                if folder_name == ROOT_FOLDER:
                     continue  # Пропускаем файлы в корне
                 
                 print(f"\n📁 Обрабатываем папку: {folder_name}")
@@ -688,47 +641,8 @@ def create_simple_excel_report():
                 ws = wb.active
                 ws.title = folder_name
                 
-                # Получаем все пункты для этой папки (фильтруем по минимальной длительности ТОЛЬКО для 'губер')
-                cursor.execute("""
-                    SELECT 
-                        p.point_number,
-                        f.filename,
-                        p.tag,
-                        p.seconds,
-                        p.content,
-                        p.short_content,
-                        p.created_at
-                    FROM points p
-                    JOIN files f ON p.file_id = f.id
-                    WHERE f.file_path LIKE ? AND (p.tag != 'губер' OR p.seconds >= ?)
-                    ORDER BY f.filename, p.point_number
-                """, (f'%{folder_name}%', min_duration))
-                
-                points = cursor.fetchall()
-                
-                # Сортируем по дате/времени из имени файла (от ранней к поздней)
-                if points:
-                    from datetime import datetime
-                    def _dt_key(rec):
-                        # rec: (point_number, filename, tag, seconds, content, short_content, created_at)
-                        fn = rec[1]
-                        m = re.search(r'(\d{1,2})\.(\d{2})\s+на\s+(\d{1,2})-(\d{2})\D?', fn)
-                        if m:
-                            d, M, h, m_ = m.groups()
-                            try:
-                                # Для простого отчета год не задаётся явно; возьмем текущий год
-                                return datetime(datetime.now().year, int(M), int(d), int(h), int(m_))
-                            except:
-                                return datetime.min
-                        m2 = re.search(r'(\d{1,2})\.(\d{2})', fn)
-                        if m2:
-                            d, M = m2.groups()
-                            try:
-                                return datetime(datetime.now().year, int(M), int(d))
-                            except:
-                                return datetime.min
-                        return datetime.min
-                    points = sorted(points, key=_dt_key)
+                # Пункты этой папки
+                points = folder_points.get((folder_name,))
                 
                 if points:
                     # Заголовки
@@ -739,49 +653,21 @@ def create_simple_excel_report():
                         cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
                         cell.alignment = Alignment(horizontal="center")
                     
-                    # Данные
-                    row = 2
-                    for i, point in enumerate(points, 1):
-                        point_number, filename, tag, seconds, content, short_content, created_at = point
-                        
-                        # Извлекаем дату из имени файла (поддержка 1-2 цифр дня)
-                        d_match = re.search(r'(\d{1,2})\.(\d{2})', filename)
-                        if d_match:
-                            d, M = d_match.groups()
-                            broadcast_date = f"{int(d):02d}.{M}"
-                        else:
-                            broadcast_date = "Дата не найдена"
-                        
-                        # Используем сокращенный текст, если есть, иначе полный
-                        display_text = short_content if short_content else content[:100] + "..." if len(content) > 100 else content
-                        
-                        ws.cell(row=row, column=1, value=i)  # Простой порядковый номер строки
-                        ws.cell(row=row, column=2, value=broadcast_date)
-                        ws.cell(row=row, column=3, value=tag.title())
-                        ws.cell(row=row, column=4, value=display_text)
-                        ws.cell(row=row, column=5, value=seconds)
-                        
-                        row += 1
+                    # Данные: дата выхода в эфир без года; сокращенный текст, если есть, иначе полный
+                    data_rows = ((i, format_broadcast_at(point.broadcast_at, with_year=False),
+                                  point.tag.title(), point.display_text, point.seconds)
+                                 for i, point in enumerate(points, 1))
                     
-                    # Автоподбор ширины столбцов
-                    for column in ws.columns:
-                        max_length = 0
-                        column_letter = column[0].column_letter
-                        for cell in column:
-                            try:
-                                if len(str(cell.value)) > max_length:
-                                    max_length = len(str(cell.value))
-                            except:
-                                pass
-                        adjusted_width = min(max_length + 2, 50)  # Максимум 50 символов
-                        ws.column_dimensions[column_letter].width = adjusted_width
-                
-                # Сохраняем Excel файл
-                wb.save(excel_filename)
+                    # Строки пишутся прямо в XML листа, ширина столбцов подбирается
+                    # по ходу записи (максимум 50 символов)
+                    save_workbook_with_rows(wb, excel_filename, 2, 'ABCDE', data_rows,
+                                            autosize=True, max_width=50)
+                else:
+                    wb.save(excel_filename)
                 print(f"   ✅ Excel файл создан: {excel_filename.name}")
             
             print(f"\n🎉 Создание простых Excel отчетов завершено!")
-            print(f"📁 Обработано папок: {len(folder_groups)}")
+            print(f"📁 Обработано папок: {len(folder_names)}")
             
             return True
             
@@ -800,51 +686,44 @@ def process_points_with_gpt(db_manager):
         # Импортируем функцию GPT
         from modules.text_shortener import shorten_text
         
-        with sqlite3.connect(db_manager.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Получаем пункты без краткого описания
-            cursor.execute("""
-                SELECT id, content, tag, point_number 
-                FROM points 
-                WHERE (short_content IS NULL OR short_content = '' OR LENGTH(TRIM(short_content)) = 0)
-                ORDER BY id
-            """)
-            
-            points_to_process = cursor.fetchall()
-            
-            if not points_to_process:
-                print("✅ Все пункты уже обработаны")
-                return
-            
-
-            
-            processed = 0
-            for point_id, content, tag, point_number in points_to_process:
-                try:
-                    # Отправляем на GPT
-                    short_content = shorten_text(content)
-                    
-                    if short_content and not short_content.startswith("Ошибка"):
-                        # Сохраняем результат
-                        if db_manager.update_point_short_content(point_id, short_content):
-                            print(f"✅ Пункт {point_number} ({tag}): {short_content}")
-                            processed += 1
-                        else:
-                            print(f"❌ Ошибка сохранения пункта {point_number}")
+        # Получаем пункты без краткого описания
+        total_to_process = db_manager.count_points(without_short_content=True)
+        
+        if not total_to_process:
+            print("✅ Все пункты уже обработаны")
+            return
+        
+        # Пункты читаются потоком; обновление каждого фиксируется сразу
+        points_to_process = db_manager.iter_points(
+            ('point_id', 'content', 'tag', 'point_number'),
+            order_by=('point_id',), without_short_content=True)
+        
+        processed = 0
+        for point in points_to_process:
+            try:
+                # Отправляем на GPT
+                short_content = shorten_text(point.content)
+                
+                if short_content and not short_content.startswith("Ошибка"):
+                    # Сохраняем результат
+                    if db_manager.update_point_short_content(point.point_id, short_content):
+                        print(f"✅ Пункт {point.point_number} ({point.tag}): {short_content}")
+                        processed += 1
                     else:
-                        print(f"⚠️ Ошибка GPT для пункта {point_number}: {short_content}")
-                    
-                    # Небольшая пауза между запросами
-                    import time
-                    time.sleep(1)
-                    
-                except Exception as e:
-                    print(f"❌ Ошибка обработки пункта {point_id}: {e}")
-                    continue
-            
-            print(f"🎉 Обработка завершена: {processed}/{len(points_to_process)} пунктов")
-            
+                        print(f"❌ Ошибка сохранения пункта {point.point_number}")
+                else:
+                    print(f"⚠️ Ошибка GPT для пункта {point.point_number}: {short_content}")
+                
+                # Небольшая пауза между запросами
+                import time
+                time.sleep(1)
+                
+            except Exception as e:
+                print(f"❌ Ошибка обработки пункта {point.point_id}: {e}")
+                continue
+        
+        print(f"🎉 Обработка завершена: {processed}/{total_to_process} пунктов")
+        
     except ImportError:
         print("❌ Модуль text_shortener не найден")
     except Exception as e:
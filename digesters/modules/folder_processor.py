@@ -5,11 +5,24 @@
 Извлекает пункты и сохраняет в SQLite базу данных
 """
 
+import io
 import os
 import re
+import mmap
+import time
+import contextlib
+import hashlib
+import zipfile
 import yaml
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from modules.database import DatabaseManager
+from datetime import datetime
+from xml.parsers import expat
+from modules.database import (DatabaseManager, adopt_legacy_database, delete_database_files,
+                              month_database_path, parse_broadcast_at, read_report_year)
+from modules.records import FileRecord, Point
+from modules.text_cache import TextCache
 
 def read_folder_path():
     """Читает путь к папке из config.yaml"""
@@ -68,66 +81,166 @@ def normalize_tag(raw_tag: str) -> str:
 
     return tag
 
+# Заголовок пункта: номер, точка или скобка и открывающая скобка тега.
+# Пункты имеют вид 1.(губер-57) текст, 2.(губер 63) текст или 3) (губер-49) текст.
+# (?<!\d) разрешает совпадение только с первой цифры номера - так каждый
+# символ текста просматривается регулярным выражением O(1) раз
+_POINT_HEADER_RE = re.compile(r'(?<!\d)(\d+)([.)])\s*\(')
+_PAREN_RE = re.compile(r'[()]')
+
+def _parse_tag_dash_seconds(inner):
+    r"""Разбирает содержимое скобок формата (тег-время) / (тег время).
+    
+    Повторяет поведение шаблона \s*([^-()]+?)\s*[-–—]?\s*(\d+)\s* с ленивым
+    тегом, но за линейное время. Возвращает (тег, секунды) или None.
+    """
+    end = len(inner)
+    while end > 0 and inner[end - 1].isspace():
+        end -= 1
+    
+    # Секунды - цифры в конце
+    digits_start = end
+    while digits_start > 0 and inner[digits_start - 1].isdecimal():
+        digits_start -= 1
+    if digits_start == end:
+        return None
+    
+    # Самое раннее начало разделителя "пробелы, тире, пробелы" перед секундами
+    separator_start = digits_start
+    while separator_start > 0 and inner[separator_start - 1].isspace():
+        separator_start -= 1
+    if separator_start > 0 and inner[separator_start - 1] in '-–—':
+        separator_start -= 1
+        while separator_start > 0 and inner[separator_start - 1].isspace():
+            separator_start -= 1
+    
+    leading = 0
+    while leading < end and inner[leading].isspace():
+        leading += 1
+    
+    # Ленивый тег заканчивается на первой позиции, откуда остаток - разделитель
+    # и секунды. Если с полным отступом не вышло, шаблон пробует отдать тегу
+    # один пробел; дальнейшее уменьшение отступа результата не меняет
+    for tag_start in (leading, leading - 1):
+        if tag_start < 0:
+            break
+        tag_end = max(separator_start, tag_start + 1)
+        if tag_end < end and '-' not in inner[tag_start:tag_end]:
+            return inner[tag_start:tag_end], inner[max(tag_end, digits_start):end]
+    
+    return None
+
+def _parse_tag_words_seconds(inner):
+    r"""Разбирает содержимое скобок формата (тег из слов время).
+    
+    Повторяет поведение шаблона
+    \s*([^-()0-9\s]+(?:\s+[^-()0-9\s]+)*)\s+(\d+)\s*. Возвращает (тег, секунды) или None.
+    """
+    stripped = inner.strip()
+    digits_start = len(stripped)
+    while digits_start > 0 and stripped[digits_start - 1].isdecimal():
+        digits_start -= 1
+    if digits_start == len(stripped) or digits_start == 0 or not stripped[digits_start - 1].isspace():
+        return None
+    
+    tag = stripped[:digits_start].rstrip()
+    if any(char in '-()0123456789' for char in tag):
+        return None
+    
+    return tag, stripped[digits_start:]
+
+# Порядок просмотра повторяет прежний каскад шаблонов: формат с точкой,
+# затем со скобкой, затем со скобкой и тегом из слов. При совпадении позиций
+# остается первый найденный вариант. Формат с точкой и тегом из слов, а также
+# "запасные" шаблоны для последнего пункта всегда находят уже найденные
+# позиции, поэтому отдельно не просматриваются
+_POINT_SCANS = (
+    ('.', _parse_tag_dash_seconds),
+    (')', _parse_tag_dash_seconds),
+    (')', _parse_tag_words_seconds),
+)
+
+def _scan_points(text_content, headers, header_starts, marker, parse_tag):
+    """Один проход по найденным заголовкам с указанным разделителем номера.
+    
+    Возвращает кортежи (позиция, номер, тег, секунды, текст). Текст пункта
+    продолжается до следующего заголовка (в том числе нераспознанного) или до
+    конца текста, как у прежнего шаблона с lookahead.
+    """
+    text_length = len(text_content)
+    search_from = 0
+    next_header = 0
+    
+    for index, header in enumerate(headers):
+        if header.start() < search_from or header.group(2) != marker:
+            continue
+        
+        # Тег и время - до первой закрывающей скобки, без вложенных скобок
+        open_pos = header.end() - 1
+        paren = _PAREN_RE.search(text_content, open_pos + 1)
+        if not paren or paren.group() != ')':
+            continue
+        
+        parsed = parse_tag(text_content[open_pos + 1:paren.start()])
+        if not parsed:
+            continue
+        raw_tag, seconds = parsed
+        
+        body_start = paren.end()
+        while body_start < text_length and text_content[body_start].isspace():
+            body_start += 1
+        
+        next_header = max(next_header, index + 1)
+        while next_header < len(headers) and header_starts[next_header] < body_start:
+            next_header += 1
+        body_end = header_starts[next_header] if next_header < len(headers) else text_length
+        
+        yield header.start(), int(header.group(1)), raw_tag, int(seconds), text_content[body_start:body_end]
+        search_from = body_end
+
 def parse_text_into_points(text_content):
-    """Разбивает текст на пункты и создает список словарей"""
+    """Разбивает текст на пункты и создает список записей Point.
+    
+    Заголовки пунктов ищутся одним проходом по тексту, после чего тексты
+    пунктов вырезаются между заголовками - время работы линейно по длине текста.
+    """
     if not text_content or not isinstance(text_content, str):
         return []
     
-    # Ищем пункты по форматам: число.(тег-время) текст или число) (тег-время) текст
-    # Паттерны: 1.(губер-57) текст, 2.(губер-63) текст, 3) (губер-49) текст
-    # Также поддерживаем формат с пробелом: 1.(губер 57) текст
-    # Учитываем различные варианты пробелов: перед скобками, за скобками, внутри
-    patterns = [
-        # Универсальные паттерны с гибкой обработкой пробелов
-        # Формат с точкой: 1. (тег-время) или 1.(тег время)
-        r'(\d+)\.\s*\(\s*([^-()]+?)\s*[-–—]?\s*(\d+)\s*\)\s*(.*?)(?=\d+[.)]\s*\(|$)',  # тег-время с разными дефисами
-        r'(\d+)\.\s*\(\s*([^-()0-9\s]+(?:\s+[^-()0-9\s]+)*)\s+(\d+)\s*\)\s*(.*?)(?=\d+[.)]\s*\(|$)',  # тег время
-        
-        # Формат со скобкой: 1) (тег-время) или 1)(тег время)  
-        r'(\d+)\)\s*\(\s*([^-()]+?)\s*[-–—]?\s*(\d+)\s*\)\s*(.*?)(?=\d+[.)]\s*\(|$)',  # тег-время
-        r'(\d+)\)\s*\(\s*([^-()0-9\s]+(?:\s+[^-()0-9\s]+)*)\s+(\d+)\s*\)\s*(.*?)(?=\d+[.)]\s*\(|$)',  # тег время
-        
-        # Запасные паттерны для последнего пункта (без lookahead)
-        r'(\d+)\.\s*\(\s*([^-()]+?)\s*[-–—]?\s*(\d+)\s*\)\s*(.*?)$',
-        r'(\d+)\.\s*\(\s*([^-()0-9\s]+(?:\s+[^-()0-9\s]+)*)\s+(\d+)\s*\)\s*(.*?)$',
-        r'(\d+)\)\s*\(\s*([^-()]+?)\s*[-–—]?\s*(\d+)\s*\)\s*(.*?)$',
-        r'(\d+)\)\s*\(\s*([^-()0-9\s]+(?:\s+[^-()0-9\s]+)*)\s+(\d+)\s*\)\s*(.*?)$'
-    ]
+    headers = list(_POINT_HEADER_RE.finditer(text_content))
+    header_starts = [header.start() for header in headers]
     
     points = []
     found_positions = set()  # Отслеживаем уже найденные позиции, чтобы избежать дубликатов
     
-    for i, pattern in enumerate(patterns):
-        matches = re.finditer(pattern, text_content, re.DOTALL | re.IGNORECASE)
-        
-        for match in matches:
-            start_pos = match.start()
+    for marker, parse_tag in _POINT_SCANS:
+        for start_pos, point_number, raw_tag, seconds, point_text in _scan_points(
+                text_content, headers, header_starts, marker, parse_tag):
             
             # Проверяем, что эту позицию мы еще не обрабатывали
-            if start_pos not in found_positions:
-                found_positions.add(start_pos)
-                
-                point_number = int(match.group(1))
-                raw_tag = match.group(2).strip()  # тег (губер, админ и т.д.)
-                seconds = int(match.group(3))  # время из скобок
-                point_text = match.group(4).strip()  # текст пункта
-
-                tag = normalize_tag(raw_tag)
-                
-                # Проверяем, что пункт содержит достаточную длину
-                if len(point_text) >= 10:
-                    points.append({
-                        'value': point_text,
-                        'seconds': seconds,
-                        'tag': tag,
-                        'point_number': point_number
-                    })
+            if start_pos in found_positions:
+                continue
+            found_positions.add(start_pos)
+            
+            tag = normalize_tag(raw_tag.strip())
+            point_text = point_text.strip()
+            
+            # Проверяем, что пункт содержит достаточную длину
+            if len(point_text) >= 10:
+                points.append(Point(point_number, tag, seconds, point_text))
     
     # Сортируем по номеру пункта
-    points.sort(key=lambda x: x.get('point_number', 0))
+    points.sort(key=lambda point: point.point_number)
     
     return points
 
+def _open_binary(file_path):
+    """Открывает путь на чтение в двоичном режиме; открытый файловый объект
+    (например, io.BytesIO с уже прочитанным содержимым) возвращает как есть"""
+    if hasattr(file_path, 'read'):
+        return contextlib.nullcontext(file_path)
+    return open(file_path, 'rb')
+
 def read_odt_content_simple(file_path):
     """Читает .odt файл как ZIP архив и извлекает текст из content.xml"""
     try:
@@ -150,7 +263,7 @@ def read_odt_content_advanced(file_path):
     try:
         from odf import text, teletype
         from odf.opendocument import load
-        doc = load(str(file_path))
+        doc = load(file_path if hasattr(file_path, 'read') else str(file_path))
         content = teletype.extractText(doc)
         return content, "odt_clean"
     except ImportError:
@@ -160,6 +273,89 @@ def read_odt_content_advanced(file_path):
         # Если что-то пошло не так, пробуем простой метод
         return read_odt_content_simple(file_path)
 
+def _iter_zip_xml(file_path, member, start_element, end_element, character_data,
+                  ready, chunk_size):
+    """Подает XML-файл из архива парсеру expat блоками по chunk_size байт.
+    
+    Обработчики складывают готовые абзацы в список ready, который
+    опустошается после каждого блока.
+    """
+    parser = expat.ParserCreate(namespace_separator=' ')
+    parser.buffer_text = True
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.CharacterDataHandler = character_data
+    
+    with zipfile.ZipFile(file_path, 'r') as zip_file:
+        with zip_file.open(member) as content:
+            while True:
+                chunk = content.read(chunk_size)
+                parser.Parse(chunk, not chunk)
+                yield from ready
+                ready.clear()
+                if not chunk:
+                    break
+
+# Пространство имен текстовых элементов OpenDocument
+_ODF_TEXT_NS = 'urn:oasis:names:tc:opendocument:xmlns:text:1.0'
+_ODF_PARAGRAPHS = {f'{_ODF_TEXT_NS} p', f'{_ODF_TEXT_NS} h'}
+_ODF_SPACE = f'{_ODF_TEXT_NS} s'
+_ODF_TAB = f'{_ODF_TEXT_NS} tab'
+_ODF_LINE_BREAK = f'{_ODF_TEXT_NS} line-break'
+
+def iter_odt_paragraphs(file_path, chunk_size=64 * 1024):
+    """Потоково разбирает content.xml из .odt и возвращает непустые абзацы по одному.
+    
+    Документ не строится целиком: content.xml читается из архива блоками и
+    передается инкрементальному парсеру expat, в памяти держится только
+    текущий абзац.
+    """
+    ready = []
+    parts = []
+    depth = 0
+    
+    def start_element(name, attrs):
+        nonlocal depth
+        if name in _ODF_PARAGRAPHS:
+            depth += 1
+        elif depth:
+            if name == _ODF_SPACE:
+                parts.append(' ' * int(attrs.get(f'{_ODF_TEXT_NS} c', 1)))
+            elif name == _ODF_TAB:
+                parts.append('\t')
+            elif name == _ODF_LINE_BREAK:
+                parts.append('\n')
+    
+    def end_element(name):
+        nonlocal depth
+        if name in _ODF_PARAGRAPHS:
+            depth -= 1
+            # Вложенные абзацы (сноски, врезки) остаются частью внешнего
+            if not depth:
+                paragraph = ''.join(parts)
+                parts.clear()
+                if paragraph.strip():
+                    ready.append(paragraph)
+    
+    def character_data(data):
+        if depth:
+            parts.append(data)
+    
+    return _iter_zip_xml(file_path, 'content.xml', start_element, end_element,
+                         character_data, ready, chunk_size)
+
+def read_odt_content_stream(file_path):
+    """Читает .odt файл потоковым разбором content.xml (абзацы через перевод строки)"""
+    try:
+        content = '\n'.join(iter_odt_paragraphs(file_path))
+        if content:
+            return content, "odt_stream"
+        else:
+            return "", "odt_empty"
+    except Exception:
+        # Поврежденный архив или XML - пробуем через odfpy
+        return read_odt_content_advanced(file_path)
+
 def read_docx_content(file_path):
     """Читает .docx файл используя python-docx"""
     try:
@@ -179,11 +375,79 @@ def read_docx_content(file_path):
     except Exception as e:
         return f"❌ Ошибка чтения .docx файла: {e}", "docx_error"
 
+# Элементы WordprocessingML, из которых складывается текст абзаца
+_DOCX_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+_DOCX_PARAGRAPH = f'{_DOCX_NS} p'
+_DOCX_TEXT = f'{_DOCX_NS} t'
+_DOCX_SPECIAL_CHARS = {
+    f'{_DOCX_NS} tab': '\t',
+    f'{_DOCX_NS} ptab': '\t',
+    f'{_DOCX_NS} br': '\n',
+    f'{_DOCX_NS} cr': '\n',
+    f'{_DOCX_NS} noBreakHyphen': '-',
+}
+# Запасное представление надписей (VML) дублирует основное - пропускаем его
+_DOCX_FALLBACK = 'http://schemas.openxmlformats.org/markup-compatibility/2006 Fallback'
+
+def iter_docx_paragraphs(file_path, chunk_size=64 * 1024):
+    """Потоково разбирает word/document.xml из .docx и возвращает непустые абзацы.
+    
+    Абзацы идут в порядке документа, включая ячейки таблиц и надписи
+    (абзац надписи возвращается перед абзацем, в котором она закреплена).
+    Объекты python-docx не создаются.
+    """
+    ready = []
+    paragraphs = []  # Стек открытых абзацев: надписи вложены в абзац
+    in_text = False
+    fallback_depth = 0
+    
+    def start_element(name, attrs):
+        nonlocal in_text, fallback_depth
+        if fallback_depth or name == _DOCX_FALLBACK:
+            fallback_depth += 1
+        elif name == _DOCX_PARAGRAPH:
+            paragraphs.append([])
+        elif paragraphs:
+            if name == _DOCX_TEXT:
+                in_text = True
+            elif name in _DOCX_SPECIAL_CHARS:
+                paragraphs[-1].append(_DOCX_SPECIAL_CHARS[name])
+    
+    def end_element(name):
+        nonlocal in_text, fallback_depth
+        if fallback_depth:
+            fallback_depth -= 1
+        elif name == _DOCX_PARAGRAPH:
+            paragraph = ''.join(paragraphs.pop())
+            if paragraph.strip():
+                ready.append(paragraph)
+        elif name == _DOCX_TEXT:
+            in_text = False
+    
+    def character_data(data):
+        if in_text and not fallback_depth:
+            paragraphs[-1].append(data)
+    
+    return _iter_zip_xml(file_path, 'word/document.xml', start_element, end_element,
+                         character_data, ready, chunk_size)
+
+def read_docx_content_stream(file_path):
+    """Читает .docx файл потоковым разбором word/document.xml (включая таблицы)"""
+    try:
+        content = '\n'.join(iter_docx_paragraphs(file_path))
+        if content:
+            return content, "docx_stream"
+        else:
+            return "", "docx_empty"
+    except Exception:
+        # Поврежденный архив или XML - пробуем через python-docx
+        return read_docx_content(file_path)
+
 def read_doc_content(file_path):
     """Читает .doc файл используя mammoth или docx2txt"""
     try:
         import mammoth
-        with open(file_path, "rb") as docx_file:
+        with _open_binary(file_path) as docx_file:
             result = mammoth.extract_raw_text(docx_file)
             if result.value:
                 return result.value, "doc_clean"
@@ -192,7 +456,7 @@ def read_doc_content(file_path):
     except ImportError:
         try:
             import docx2txt
-            content = docx2txt.process(str(file_path))
+            content = docx2txt.process(file_path if hasattr(file_path, 'read') else str(file_path))
             if content:
                 return content, "doc_clean"
             else:
@@ -204,47 +468,409 @@ def read_doc_content(file_path):
     except Exception as e:
         return f"❌ Ошибка чтения .doc файла через mammoth: {e}", "doc_error"
 
-def read_file_content(file_path):
-    """Читает содержимое файла в зависимости от его типа"""
+# Сигнатуры двоичных форматов, которые не имеет смысла декодировать как текст
+_BINARY_SIGNATURES = (
+    b'%PDF',                # PDF
+    b'\x89PNG',             # PNG
+    b'\xff\xd8\xff',         # JPEG
+    b'GIF8',                # GIF
+    b'PK\x03\x04',           # ZIP (в т.ч. неизвестные офисные форматы)
+    b'\xd0\xcf\x11\xe0',      # OLE2 (.xls, .ppt и др.)
+    b'Rar!',                # RAR
+    b'7z\xbc\xaf',            # 7-Zip
+    b'\x1f\x8b',              # gzip
+    b'ID3',                 # MP3
+    b'RIFF',                # WAV/AVI
+    b'\x7fELF',             # ELF
+    b'MZ',                  # EXE/DLL
+)
+_TEXT_BOMS = (
+    (b'\xef\xbb\xbf', 'utf-8-sig'),
+    (b'\xff\xfe', 'utf-16'),
+    (b'\xfe\xff', 'utf-16'),
+)
+# Файлы больше этого размера отображаются в память, а не читаются в буфер
+_MMAP_THRESHOLD = 4 * 1024 * 1024
+# Объем начала файла для эвристик (нулевые байты, частоты cp1251)
+_SNIFF_SIZE = 64 * 1024
+# Слова из двух и более букв кириллицы в cp1251 (А-я, Ё, ё). В latin-1 байты
+# из этого диапазона - одиночные буквы с диакритикой внутри латинских слов
+_CP1251_WORD_RE = re.compile(rb'[\xc0-\xff\xa8\xb8]{2,}')
+_ASCII_BYTES = bytes(range(0x80))
+
+def detect_text_encoding(data):
+    """Определяет кодировку текста по уже прочитанному буферу.
+    
+    Порядок проверок: BOM, корректность UTF-8, затем частотная эвристика
+    cp1251 (большинство байтов старше 0x7F образуют слова из букв кириллицы),
+    иначе latin-1.
+    """
+    for bom, encoding in _TEXT_BOMS:
+        if data[:len(bom)] == bom:
+            return encoding
+    
+    try:
+        str(data, 'utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    
+    sample = bytes(data[:_SNIFF_SIZE])
+    high_count = len(sample) - len(sample.translate(None, _ASCII_BYTES))
+    cyrillic_count = sum(len(word) for word in _CP1251_WORD_RE.findall(sample))
+    if cyrillic_count * 2 >= high_count:
+        try:
+            str(data, 'cp1251')
+            return 'cp1251'
+        except UnicodeDecodeError:
+            pass
+    
+    return 'latin-1'
+
+def _looks_binary(head):
+    """Проверяет начало файла на сигнатуры двоичных форматов и нулевые байты"""
+    return head.startswith(_BINARY_SIGNATURES) or (
+        b'\x00' in head and not head.startswith((b'\xff\xfe', b'\xfe\xff')))
+
+def decode_text_buffer(data):
+    """Декодирует буфер (bytes или mmap) с определением кодировки"""
+    if not len(data):
+        return "", "utf-8"
+    
+    if _looks_binary(bytes(data[:_SNIFF_SIZE])):
+        return f"[Бинарный файл, размер: {len(data)} байт]", "binary"
+    
+    encoding = detect_text_encoding(data)
+    content = str(data, encoding)
+    
+    # Как при чтении в текстовом режиме, приводим переводы строк к \n
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    
+    return content, encoding
+
+def read_text_file(file_path, data=None):
+    """Читает текстовый файл одним чтением и определяет кодировку по буферу.
+    
+    Если содержимое уже прочитано, оно передается в data. Двоичные файлы
+    распознаются по сигнатуре и нулевым байтам в начале файла и целиком не
+    читаются. Большие файлы отображаются в память (mmap).
+    """
+    if data is not None:
+        return decode_text_buffer(data)
+    
+    with open(file_path, 'rb') as file:
+        file_size = os.fstat(file.fileno()).st_size
+        if not file_size:
+            return "", "utf-8"
+        
+        head = file.read(_SNIFF_SIZE)
+        if _looks_binary(head):
+            return f"[Бинарный файл, размер: {file_size} байт]", "binary"
+        
+        if file_size <= _MMAP_THRESHOLD:
+            return decode_text_buffer(head + file.read())
+        
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return decode_text_buffer(mapped)
+
+def read_file_content(file_path, data=None):
+    """Читает содержимое файла в зависимости от его типа.
+    
+    Если байты файла уже прочитаны, они передаются в data и файл
+    повторно не открывается.
+    """
     file_ext = file_path.suffix.lower()
+    source = io.BytesIO(data) if data is not None else file_path
     
     # Для .odt файлов используем специальную обработку
     if file_ext == '.odt':
-        return read_odt_content_advanced(file_path)
+        return read_odt_content_stream(source)
     
     # Для .docx файлов используем специальную обработку
     elif file_ext == '.docx':
-        return read_docx_content(file_path)
+        return read_docx_content_stream(source)
     
     # Для .doc файлов используем специальную обработку
     elif file_ext == '.doc':
-        return read_doc_content(file_path)
+        return read_doc_content(source)
     
-    # Для остальных файлов пробуем обычное чтение
+    # Для остальных файлов - чтение как текста с определением кодировки
     try:
-        # Пробуем разные кодировки
-        encodings = ['utf-8', 'cp1251', 'windows-1251', 'latin-1', 'iso-8859-1']
+        return read_text_file(file_path, data)
+    except Exception as e:
+        return f"❌ Ошибка чтения файла: {e}", "error"
+
+def compute_file_hash(file_path, chunk_size=1024 * 1024):
+    """Считает SHA-256 содержимого файла, читая его блоками"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# Версия извлечения текста: увеличивается при любом изменении читалок,
+# чтобы записи кэша текста от прежней версии не использовались
+EXTRACTOR_VERSION = 1
+
+# Кэшируется только текст документов: обычные файлы дешевле прочитать заново
+_CACHED_EXTENSIONS = {'.docx', '.odt', '.doc'}
+
+def load_text_cache():
+    """Создает кэш извлеченного текста по настройкам text_cache из config.yaml.
+    
+    Возвращает None, если кэш отключен (max_size_mb: 0).
+    """
+    try:
+        with open('config.yaml', 'r', encoding='utf-8') as file:
+            config = yaml.safe_load(file) or {}
+            cache_config = config.get('text_cache', {}) or {}
+    except Exception:
+        cache_config = {}
+    
+    max_size_mb = cache_config.get('max_size_mb', 512)
+    if not max_size_mb:
+        return None
+    
+    return TextCache(cache_config.get('path', 'text_cache.db'), max_size_mb)
+
+# Параметры конвейера загрузки: потоки чтения, глубина очереди между
+# стадиями и число файлов, записываемых в базу одной транзакцией
+_READER_THREADS = 4
+_PIPELINE_QUEUE_SIZE = 32
+_WRITE_BATCH_SIZE = 200
+
+def read_stage(file, file_size, known_hash=None, text_cache=None):
+    """Стадия чтения (поток ввода-вывода): читает байты файла, считает хэш
+    и ищет извлеченный текст в кэше.
+    
+    Большие файлы только хэшируются блоками - их читает стадия разбора.
+    Если хэш совпал с known_hash, 'unchanged' = True и разбор не нужен.
+    """
+    started = time.perf_counter()
+    data = None
+    try:
+        if file_size > _MMAP_THRESHOLD:
+            content_hash = compute_file_hash(file)
+        else:
+            with open(file, 'rb') as f:
+                data = f.read()
+            content_hash = hashlib.sha256(data).hexdigest()
+    except OSError:
+        content_hash = None
+    
+    unchanged = known_hash is not None and content_hash == known_hash
+    
+    cache_key = None
+    cached = None
+    file_type = file.suffix.lower()
+    if not unchanged and text_cache and content_hash and file_type in _CACHED_EXTENSIONS:
+        cache_key = TextCache.make_key(content_hash, file_type, EXTRACTOR_VERSION)
+        cached = text_cache.get(cache_key)
+    
+    return {
+        'content_hash': content_hash,
+        'unchanged': unchanged,
+        'data': None if unchanged or cached else data,
+        'cached': cached,
+        'cache_key': cache_key,
+        'bytes': file_size,
+        'seconds': time.perf_counter() - started
+    }
+
+def parse_stage(file, data=None, cached=None, keep_content=False):
+    """Стадия разбора (рабочий процесс): извлекает текст и разбивает его на пункты.
+    
+    Не обращается к базе данных и не пишет в кэш. Если keep_content, извлеченный
+    текст возвращается для записи в кэш (ошибки чтения не кэшируются).
+    """
+    started = time.perf_counter()
+    if cached:
+        content, encoding = cached
+    else:
+        content, encoding = read_file_content(file, data)
+    
+    return {
+        'encoding': encoding,
+        'points': parse_text_into_points(content),
+        'content': content if keep_content and not encoding.endswith('error') else None,
+        'seconds': time.perf_counter() - started
+    }
+
+def _pipeline_stage(executor, tasks, queue_size):
+    """Выполняет задачи стадии в executor, возвращая пары (контекст, результат)
+    в исходном порядке.
+    
+    tasks - кортежи (контекст, функция, аргументы); при функции None
+    результатом считаются сами аргументы. Одновременно в работе не больше
+    queue_size задач: следующая задача отправляется, только когда забирают
+    результат, - так предыдущая стадия не убегает вперед (обратное давление).
+    """
+    pending = deque()
+    for context, func, args in tasks:
+        if func is None:
+            future = Future()
+            future.set_result(args)
+        else:
+            future = executor.submit(func, *args)
+        pending.append((context, future))
         
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as file:
-                    content = file.read()
-                    return content, encoding
-            except UnicodeDecodeError:
+        if len(pending) >= queue_size:
+            context, future = pending.popleft()
+            yield context, future.result()
+    
+    while pending:
+        context, future = pending.popleft()
+        yield context, future.result()
+
+def new_pipeline_stats():
+    """Счетчики стадий конвейера загрузки"""
+    return {
+        'read': {'files': 0, 'bytes': 0, 'seconds': 0.0},
+        'parse': {'files': 0, 'points': 0, 'seconds': 0.0},
+        'write': {'files': 0, 'batches': 0, 'seconds': 0.0}
+    }
+
+def iter_ingested_files(files, db_manager, incremental=False, jobs=1, text_cache=None, stats=None,
+                        year=None):
+    """Обрабатывает файлы конвейером и сохраняет результаты в базу данных.
+    
+    Стадии: потоки чтения (байты, хэш, кэш текста) -> пул из jobs процессов
+    для извлечения текста и разбора -> единственный писатель в текущем
+    процессе, который сохраняет файлы пачками по одной транзакции. Между
+    стадиями - очереди ограниченной длины. Результаты записываются строго в
+    порядке files. Для каждого файла возвращает кортеж (статус, количество
+    пунктов), где статус: 'parsed' - файл разобран заново, 'unchanged' - файл
+    не изменился (только в инкрементальном режиме), 'error' - файл не удалось
+    сохранить. Если передан text_cache, текст документов берется из кэша и
+    пополняет его; в stats (см. new_pipeline_stats) накапливаются счетчики стадий.
+    year - год для даты выхода в эфир, разбираемой из имени файла.
+    """
+    if year is None:
+        year = datetime.now().year
+    if stats is None:
+        stats = new_pipeline_stats()
+    
+    # Определяем, какие файлы нужно читать (быстрая проверка по размеру и mtime)
+    file_states = db_manager.get_file_states() if incremental else {}
+    plan = []
+    for file in files:
+        stat = file.stat()
+        state = file_states.get(str(file))
+        unchanged = state is not None and state.file_size == stat.st_size and state.file_mtime == stat.st_mtime_ns
+        plan.append((file, stat, state, unchanged))
+    
+    queue_size = max(_PIPELINE_QUEUE_SIZE, jobs * 4)
+    reader_pool = ThreadPoolExecutor(max_workers=_READER_THREADS)
+    if jobs > 1:
+        parser_pool = ProcessPoolExecutor(max_workers=jobs)
+    else:
+        parser_pool = ThreadPoolExecutor(max_workers=1)
+    
+    def read_tasks():
+        for entry in plan:
+            file, stat, state, unchanged = entry
+            if unchanged:
+                yield entry, None, None
+            else:
+                # Файл мог быть скопирован или "тронут" без изменения содержимого
+                known_hash = state.content_hash if state else None
+                yield entry, read_stage, (file, stat.st_size, known_hash, text_cache)
+    
+    def parse_tasks():
+        for entry, read in _pipeline_stage(reader_pool, read_tasks(), queue_size):
+            if read is None or read['unchanged']:
+                yield (entry, read), None, None
+            else:
+                keep_content = read['cache_key'] is not None and not read['cached']
+                yield (entry, read), parse_stage, (entry[0], read['data'], read['cached'], keep_content)
+    
+    def write_batch(batch):
+        """Сохраняет пачку одной транзакцией и возвращает статусы файлов"""
+        started = time.perf_counter()
+        parsed_files = []
+        touched_files = []
+        for (file, stat, state, unchanged), read, parsed in batch:
+            if unchanged:
+                continue
+            if read['unchanged']:
+                touched_files.append((state.id, stat.st_size, stat.st_mtime_ns))
                 continue
+            
+            if read['cache_key']:
+                if read['cached']:
+                    text_cache.record_hit(read['cache_key'])
+                else:
+                    text_cache.record_miss()
+                    if parsed['content'] is not None:
+                        text_cache.put(read['cache_key'], parsed['content'], parsed['encoding'])
+            
+            parsed_files.append((FileRecord(
+                filename=file.name,
+                file_path=file,
+                file_type=file.suffix.lower(),
+                encoding=parsed['encoding'],
+                file_size=stat.st_size,
+                file_mtime=stat.st_mtime_ns,
+                content_hash=read['content_hash'],
+                broadcast_at=parse_broadcast_at(file.name, year)
+            ), parsed['points']))
         
-        # Если не удалось прочитать как текст, пробуем как бинарный
-        try:
-            with open(file_path, 'rb') as file:
-                content = file.read()
-                return f"[Бинарный файл, размер: {len(content)} байт]", "binary"
-        except:
-            return f"❌ Не удалось прочитать файл", "error"
+        file_ids = iter(db_manager.save_batch(parsed_files, touched_files))
+        stats['write']['files'] += len(parsed_files) + len(touched_files)
+        stats['write']['batches'] += 1
+        stats['write']['seconds'] += time.perf_counter() - started
+        
+        statuses = []
+        for (file, stat, state, unchanged), read, parsed in batch:
+            if unchanged or read['unchanged']:
+                statuses.append(('unchanged', state.points_count))
+            elif next(file_ids):
+                statuses.append(('parsed', len(parsed['points'])))
+            else:
+                statuses.append(('error', 0))
+        return statuses
+    
+    try:
+        batch = []
+        for (entry, read), parsed in _pipeline_stage(parser_pool, parse_tasks(), queue_size):
+            if read is not None:
+                stats['read']['files'] += 1
+                stats['read']['bytes'] += read['bytes']
+                stats['read']['seconds'] += read['seconds']
+            if parsed is not None:
+                stats['parse']['files'] += 1
+                stats['parse']['points'] += len(parsed['points'])
+                stats['parse']['seconds'] += parsed['seconds']
             
-    except Exception as e:
-        return f"❌ Ошибка чтения файла: {e}", "error"
+            batch.append((entry, read, parsed))
+            if len(batch) >= _WRITE_BATCH_SIZE:
+                yield from write_batch(batch)
+                batch = []
+        
+        if batch:
+            yield from write_batch(batch)
+    finally:
+        reader_pool.shutdown(cancel_futures=True)
+        parser_pool.shutdown(cancel_futures=True)
+        if text_cache:
+            text_cache.close_readers()
+
+def print_pipeline_stats(stats):
+    """Печатает пропускную способность стадий конвейера загрузки"""
+    def rate(count, seconds):
+        return f"{count / seconds:.0f} файлов/с" if seconds > 0 else "—"
+    
+    read, parse, write = stats['read'], stats['parse'], stats['write']
+    print("⚙️ Стадии загрузки (время работы / пропускная способность):")
+    print(f"  📖 Чтение: {read['files']} файлов, {read['bytes'] / (1024 * 1024):.1f} МБ "
+          f"за {read['seconds']:.2f} с ({rate(read['files'], read['seconds'])})")
+    print(f"  🧩 Разбор: {parse['files']} файлов, {parse['points']} пунктов "
+          f"за {parse['seconds']:.2f} с ({rate(parse['files'], parse['seconds'])})")
+    print(f"  💾 Запись: {write['files']} файлов, {write['batches']} транзакций "
+          f"за {write['seconds']:.2f} с ({rate(write['files'], write['seconds'])})")
 
-def read_files_from_folder(folder_path, db_manager):
+def read_files_from_folder(folder_path, db_manager, incremental=False, jobs=1, text_cache=None, year=None):
     """Читает файлы из указанной папки и анализирует их содержимое"""
     folder = Path(folder_path)
     
@@ -258,16 +884,31 @@ def read_files_from_folder(folder_path, db_manager):
     
     total_files = 0
     total_points = 0
+    unchanged_files = 0
     folder_results = []
     
-    # Проходим по всем элементам в папке
+    # Собираем список файлов заранее, чтобы обработать их одним пулом
+    entries = []
     for item in folder.iterdir():
         if item.is_dir():
-            print(f"📁 Папка: {item.name}")
-            
             # Получаем список файлов в папке
             files = list(item.glob('*'))
             files = [f for f in files if f.is_file()]  # Только файлы, не папки
+            entries.append((item, files))
+        elif item.is_file():
+            entries.append((item, None))
+    
+    all_files = []
+    for item, files in entries:
+        all_files.extend(files if files is not None else [item])
+    
+    stats = new_pipeline_stats()
+    results = iter_ingested_files(all_files, db_manager, incremental, jobs, text_cache, stats, year)
+    
+    # Проходим по всем элементам в папке
+    for item, files in entries:
+        if files is not None:
+            print(f"📁 Папка: {item.name}")
             
             if files:
                 folder_files = 0
@@ -275,29 +916,19 @@ def read_files_from_folder(folder_path, db_manager):
                 
                 # Обрабатываем каждый файл
                 for file in files:
-                    # Читаем содержимое файла
-                    content, encoding = read_file_content(file)
+                    status, points_count = next(results)
                     
-                    # Сохраняем файл в базу данных
-                    file_id = db_manager.save_file(
-                        filename=file.name,
-                        file_path=file,
-                        file_type=file.suffix.lower(),
-                        encoding=encoding
-                    )
-                    
-                    if file_id:
-                        # Разбиваем текст на пункты
-                        points = parse_text_into_points(content)
-                        if points:
-                            # Сохраняем пункты в базу данных
-                            db_manager.save_points(file_id, points)
-                            folder_points += len(points)
-                            total_points += len(points)
-                            print(f"  ✅ {file.name}: {len(points)} пунктов")
+                    if status != 'error':
+                        if status == 'unchanged':
+                            unchanged_files += 1
+                            print(f"  ⏭️ {file.name}: без изменений ({points_count} пунктов)")
+                        elif points_count:
+                            print(f"  ✅ {file.name}: {points_count} пунктов")
                         else:
                             print(f"  ⚠️ {file.name}: пункты не найдены")
                         
+                        folder_points += points_count
+                        total_points += points_count
                         folder_files += 1
                         total_files += 1
                 
@@ -313,36 +944,45 @@ def read_files_from_folder(folder_path, db_manager):
             else:
                 print("  📭 Папка пуста")
         
-        elif item.is_file():
-            # Читаем содержимое файла
-            content, encoding = read_file_content(item)
-            
-            # Сохраняем файл в базу данных
-            file_id = db_manager.save_file(
-                filename=item.name,
-                file_path=item,
-                file_type=item.suffix.lower(),
-                encoding=encoding
-            )
+        else:
+            status, points_count = next(results)
             
-            if file_id:
-                # Разбиваем текст на пункты
-                points = parse_text_into_points(content)
-                if points:
-                    # Сохраняем пункты в базу данных
-                    db_manager.save_points(file_id, points)
-                    total_points += len(points)
-                    print(f"   ✅ {item.name} → {len(points)} пунктов")
+            if status != 'error':
+                if status == 'unchanged':
+                    unchanged_files += 1
+                    print(f"   ⏭️ {item.name} → без изменений ({points_count} пунктов)")
+                elif points_count:
+                    print(f"   ✅ {item.name} → {points_count} пунктов")
                 else:
                     print(f"   ⚠️  {item.name} → пункты не найдены")
                 
+                total_points += points_count
                 total_files += 1
     
+    # Завершаем конвейер (останавливаем пулы потоков и процессов)
+    results.close()
+    
+    # Сохраняем кэш текста
+    if text_cache:
+        text_cache.flush()
+    
+    # Удаляем из базы файлы, которых больше нет на диске
+    if incremental:
+        removed_files = db_manager.delete_missing_files(all_files)
+        if removed_files:
+            print(f"🗑️ Удалено из базы отсутствующих файлов: {removed_files}")
+    
     # Итоговая сводка
     print("=" * 40)
-    print(f"📁 Папок: {len([item for item in folder.iterdir() if item.is_dir()])}")
+    print(f"📁 Папок: {len([item for item, files in entries if files is not None])}")
     print(f"📄 Файлов: {total_files}")
+    if incremental:
+        print(f"⏭️ Без изменений: {unchanged_files}")
     print(f"📋 Пунктов: {total_points}")
+    if text_cache and text_cache.hits + text_cache.misses:
+        print(f"💾 Кэш текста: {text_cache.hits} из {text_cache.hits + text_cache.misses} "
+              f"({text_cache.hit_rate():.0%}) попаданий")
+    print_pipeline_stats(stats)
     
     if folder_results:
         print("📂 Детализация:")
@@ -354,31 +994,65 @@ def read_files_from_folder(folder_path, db_manager):
     
     return total_files, total_points
 
-def process_folder():
-    """Основная функция для обработки папки"""
-    # Удаляем существующую базу данных
-    db_path = "points_database.db"
-    if os.path.exists(db_path):
-        try:
-            os.remove(db_path)
-        except Exception as e:
-            print(f"❌ Ошибка удаления БД: {e}")
-    
-    # Инициализируем новую базу данных
-    db_manager = DatabaseManager()
+def process_folder(incremental=False, jobs=1, in_memory=False):
+    """Основная функция для обработки папки.
     
-    # Читаем путь к папке из конфига
+    В инкрементальном режиме существующая база данных сохраняется:
+    заново разбираются только новые и измененные файлы.
+    jobs - число процессов для чтения и разбора файлов.
+    У каждого месяца (папки folder_path) своя база databases/<месяц>.db:
+    загрузка и пересборка затрагивают только ее, базы других месяцев
+    не переписываются и не блокируются.
+    in_memory - загрузка идет в базу в памяти, которая в конце одним
+    проходом сохраняется на диск (DatabaseManager.persist); до этого
+    момента прежняя база на диске не меняется. Если прежнюю базу не
+    удалось загрузить или новую сохранить, бросается RuntimeError.
+    """
+    # Читаем путь к папке, год отчетов и настройки кэша текста из конфига
     folder_path = read_folder_path()
+    year = read_report_year()
+    text_cache = load_text_cache()
     
-    # Анализируем файлы
-    total_files, total_points = read_files_from_folder(folder_path, db_manager)
+    db_path = month_database_path(Path(folder_path).name)
+    if incremental:
+        adopt_legacy_database(db_path)
+    
+    # Инициализируем базу данных
+    if in_memory:
+        db_manager = DatabaseManager(':memory:')
+        if incremental and os.path.exists(db_path) and not db_manager.load_from(db_path):
+            # Без прежней базы инкрементальная загрузка стала бы полной пересборкой
+            # и потеряла бы сокращенные тексты (short_content)
+            db_manager.close()
+            raise RuntimeError(f"не удалось загрузить базу {db_path}, загрузка остановлена")
+        print(f"🗄️  База данных месяца: {db_path} (загрузка в памяти)")
+    else:
+        # Удаляем базу данных месяца (кроме инкрементального режима)
+        if not incremental:
+            try:
+                delete_database_files(db_path)
+            except Exception as e:
+                print(f"❌ Ошибка удаления БД: {e}")
+        db_manager = DatabaseManager(db_path)
+        print(f"🗄️  База данных месяца: {db_path}")
+    
+    # Анализируем файлы; вся загрузка фиксируется одной транзакцией
+    with db_manager.transaction():
+        total_files, total_points = read_files_from_folder(folder_path, db_manager, incremental, jobs, text_cache, year)
     
     # Проверяем данные в БД
-    points = db_manager.get_all_points()
-    if points:
-        if len(points) != total_points:
-            print(f"⚠️  Несоответствие: найдено {total_points}, сохранено {len(points)}")
+    saved_points = db_manager.count_points()
+    if saved_points:
+        if saved_points != total_points:
+            print(f"⚠️  Несоответствие: найдено {total_points}, сохранено {saved_points}")
     else:
         print("❌ В базе данных нет пунктов")
     
-    return db_manager 
\ No newline at end of file
+    if in_memory:
+        if not db_manager.persist(db_path):
+            db_manager.close()
+            raise RuntimeError(f"база {db_path} не сохранена на диск")
+        print(f"💾 База сохранена на диск: {db_path}")
+    
+    db_manager.close()
+    return db_manager
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль кэша логотипов
+Логотип читается и уменьшается один раз на процесс, отчеты получают готовые байты
+Парсеры подключают этот файл по пути (parsers/news_logo.py), поэтому модуль
+не импортирует другие модули digesters
+"""
+
+import io
+import os
+from collections import namedtuple
+
+# Логотип: байты изображения и размеры исходного файла в пикселях
+Logo = namedtuple('Logo', 'data original_width original_height')
+
+# Во сколько раз изображение больше размера на странице (четкость при печати)
+LOGO_OVERSAMPLING = 2
+
+# Кэш процесса: (путь, mtime, ширина) -> Logo
+_logo_cache = {}
+
+def load_logo(logo_path, display_width):
+    """Логотип для вставки шириной display_width пикселей или None, если файла нет
+    или он не читается как изображение.
+
+    Файл декодируется и уменьшается до display_width * LOGO_OVERSAMPLING
+    один раз; ключ кэша включает mtime, так что замененный файл
+    перечитывается. Без Pillow кэшируются исходные байты файла.
+    """
+    try:
+        mtime = os.stat(logo_path).st_mtime_ns
+    except (OSError, TypeError, ValueError):
+        return None
+
+    key = (os.path.abspath(logo_path), mtime, display_width)
+    if key not in _logo_cache:
+        _logo_cache[key] = _decode_logo(logo_path, display_width * LOGO_OVERSAMPLING)
+    return _logo_cache[key]
+
+def _decode_logo(logo_path, max_width):
+    """Читает логотип и уменьшает его до max_width пикселей (если он шире).
+    Возвращает None, если файл не читается или это не изображение"""
+    try:
+        with open(logo_path, 'rb') as file:
+            data = file.read()
+    except OSError:
+        return None
+
+    try:
+        from PIL import Image
+    except ImportError:
+        return Logo(data, None, None)
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            original_width, original_height = image.size
+            if original_width <= max_width:
+                return Logo(data, original_width, original_height)
+
+            image_format = image.format or 'PNG'
+            height = max(1, round(original_height * max_width / original_width))
+            scaled = image.resize((max_width, height), Image.LANCZOS)
+            output = io.BytesIO()
+            scaled.save(output, format=image_format)
+            return Logo(output.getvalue(), original_width, original_height)
+    except Exception:
+        # Не изображение или поврежденный файл
+        return None
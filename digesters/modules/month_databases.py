@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль запросов по нескольким месяцам
+Каждый месяц хранится в своей базе (databases/<месяц>.db); запрос подключает
+через ATTACH только нужные месяцы и только на чтение
+"""
+
+import contextlib
+import heapq
+import sqlite3
+from pathlib import Path
+from modules.database import (DATABASES_DIR, FETCH_BATCH_SIZE, POINT_COLUMN_NAMES, POINT_COLUMNS,
+                              build_fts_query, month_database_path, points_filter_conditions,
+                              rollup_filter_conditions, where_sql)
+from modules.records import MonthSearchRow, RollupRow, point_row_type
+
+# Сколько баз можно подключить к одному соединению (SQLITE_MAX_ATTACHED по умолчанию)
+MAX_ATTACHED = 10
+
+def _sort_key(values):
+    """Ключ сортировки как в SQLite: NULL раньше любых значений"""
+    return tuple((value is not None, value) for value in values)
+
+class MonthDatabases:
+    """Запросы к базам месяцев.
+
+    Базы создает и наполняет DatabaseManager (по одной на месяц), здесь они
+    только читаются: подключение mode=ro не берет блокировок на запись,
+    поэтому загрузка одного месяца не мешает запросам по остальным.
+    Месяцы - имена папок ('ИЮЛЬ'); None - все месяцы каталога.
+    """
+
+    def __init__(self, databases_dir=DATABASES_DIR):
+        self.databases_dir = databases_dir
+
+    def months(self):
+        """Месяцы, для которых есть база"""
+        return sorted(path.stem for path in Path(self.databases_dir).glob('*.db'))
+
+    def _resolve_months(self, months):
+        """Проверяет список месяцев; месяцы без базы пропускаются с предупреждением"""
+        available = self.months()
+        if months is None:
+            return available
+        if isinstance(months, str):
+            months = [months]
+        resolved = []
+        for month in months:
+            if month in available:
+                resolved.append(month)
+            else:
+                print(f"⚠️ Нет базы за месяц: {month}")
+        return resolved
+
+    def _chunks(self, months):
+        """Разбивает месяцы на группы, которые помещаются в одно соединение"""
+        months = self._resolve_months(months)
+        return [months[start:start + MAX_ATTACHED] for start in range(0, len(months), MAX_ATTACHED)]
+
+    @contextlib.contextmanager
+    def attached(self, months):
+        """Соединение с подключенными на чтение базами месяцев.
+
+        Возвращает (conn, schemas) - schemas: [(имя схемы m0, m1..., месяц)].
+        """
+        conn = sqlite3.connect('file::memory:', uri=True)
+        try:
+            schemas = []
+            for index, month in enumerate(months):
+                schema = f"m{index}"
+                uri = Path(month_database_path(month, self.databases_dir)).absolute().as_uri() + '?mode=ro'
+                conn.execute(f'ATTACH DATABASE ? AS {schema}', (uri,))
+                schemas.append((schema, month))
+            yield conn, schemas
+        finally:
+            conn.close()
+
+    def _iter_chunk(self, months, columns, order_by, batch_size, filters):
+        """Пункты группы месяцев одним запросом UNION ALL, упорядоченные по order_by"""
+        conditions, filter_params = points_filter_conditions(**filters)
+        where = where_sql(conditions)
+
+        # Колонки сортировки добавляются в конец строки: ORDER BY составного
+        # запроса может ссылаться только на колонки результата
+        selects = []
+        params = []
+        for index, column in enumerate(tuple(columns) + tuple(order_by)):
+            name = column if index < len(columns) else f"_order{index - len(columns)}"
+            selects.append(('?' if column == 'month' else POINT_COLUMNS[column], name))
+        order_sql = ', '.join(f"_order{index}" for index in range(len(order_by)))
+
+        with self.attached(months) as (conn, schemas):
+            queries = []
+            for schema, month in schemas:
+                select_sql = ', '.join(f"{sql} AS {name}" for sql, name in selects)
+                queries.append(f'''
+                    SELECT {select_sql}
+                    FROM {schema}.points p
+                    JOIN {schema}.files f ON p.file_id = f.id
+                    {where}
+                ''')
+                params.extend(month for sql, name in selects if sql == '?')
+                params.extend(filter_params)
+
+            cursor = conn.execute(f"{' UNION ALL '.join(queries)} ORDER BY {order_sql}", params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+
+    def iter_points(self, months=None, columns=POINT_COLUMN_NAMES, order_by=('filename', 'point_number'),
+                    batch_size=FETCH_BATCH_SIZE, **filters):
+        """Перебирает пункты нескольких месяцев, как DatabaseManager.iter_points.
+
+        Кроме колонок POINT_COLUMNS доступна колонка 'month' (имя папки месяца).
+        Если месяцев больше MAX_ATTACHED, группы читаются отдельными
+        запросами и сливаются с сохранением порядка order_by.
+        """
+        row_type = point_row_type(tuple(columns))
+        width = len(columns)
+        try:
+            streams = [self._iter_chunk(chunk, columns, order_by, batch_size, filters)
+                       for chunk in self._chunks(months)]
+            for row in heapq.merge(*streams, key=lambda row: _sort_key(row[width:])):
+                yield row_type._make(row[:width])
+
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка получения пунктов по месяцам: {e}")
+
+    def count_points(self, months=None, **filters):
+        """Число пунктов нескольких месяцев, подходящих под фильтры iter_points"""
+        conditions, params = points_filter_conditions(**filters)
+        where = where_sql(conditions)
+        total = 0
+        try:
+            for chunk in self._chunks(months):
+                with self.attached(chunk) as (conn, schemas):
+                    for schema, month in schemas:
+                        total += conn.execute(f'''
+                            SELECT COUNT(*)
+                            FROM {schema}.points p
+                            JOIN {schema}.files f ON p.file_id = f.id
+                            {where}
+                        ''', params).fetchone()[0]
+            return total
+
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка подсчета пунктов по месяцам: {e}")
+            return 0
+
+    def get_rollup(self, months=None, folder=None, tag=None, date_from=None, date_to=None):
+        """Сводка по (папка, тег), просуммированная по месяцам (см. DatabaseManager.get_rollup)"""
+        conditions, params = rollup_filter_conditions(folder, tag, date_from, date_to)
+        where = where_sql(conditions)
+        totals = {}
+        try:
+            for chunk in self._chunks(months):
+                with self.attached(chunk) as (conn, schemas):
+                    for schema, month in schemas:
+                        cursor = conn.execute(f'''
+                            SELECT folder, tag, SUM(points_count), SUM(total_seconds),
+                                   SUM(short_count), SUM(short_seconds)
+                            FROM {schema}.points_rollup
+                            {where}
+                            GROUP BY folder, tag
+                        ''', params)
+                        for folder_name, tag_name, *sums in cursor:
+                            current = totals.get((folder_name, tag_name), (0, 0, 0, 0))
+                            totals[(folder_name, tag_name)] = tuple(
+                                total + (value or 0) for total, value in zip(current, sums))
+            return [RollupRow(*key, *sums) for key, sums in sorted(totals.items())]
+
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка получения сводки по месяцам: {e}")
+            return []
+
+    def search_points(self, query, months=None, folder=None, tag=None, limit=50):
+        """Полнотекстовый поиск по нескольким месяцам, лучшие совпадения первыми.
+
+        Возвращает строки MonthSearchRow (month и поля SearchRow). Оценка bm25
+        считается по статистике своего месяца, так что порядок между месяцами
+        приблизительный.
+        """
+        match = build_fts_query(query)
+        if match is None:
+            return []
+
+        conditions, filter_params = points_filter_conditions(folder=folder, tag=tag)
+        conditions.insert(0, 'points_fts MATCH ?')
+        where = where_sql(conditions)
+        results = []
+        try:
+            for chunk in self._chunks(months):
+                with self.attached(chunk) as (conn, schemas):
+                    queries = []
+                    params = []
+                    # Таблица FTS в MATCH, bm25 и snippet указывается без схемы
+                    for schema, month in schemas:
+                        queries.append(f'''
+                            SELECT * FROM (
+                                SELECT
+                                    ? AS month,
+                                    f.filename,
+                                    f.folder,
+                                    p.point_number,
+                                    p.tag,
+                                    p.seconds,
+                                    p.content,
+                                    p.short_content,
+                                    snippet(points_fts, 0, '[', ']', '...', 12),
+                                    bm25(points_fts, 1.0, 2.0) AS rank
+                                FROM {schema}.points_fts
+                                JOIN {schema}.points p ON p.id = points_fts.rowid
+                                JOIN {schema}.files f ON p.file_id = f.id
+                                {where}
+                                ORDER BY rank
+                                LIMIT ?
+                            )
+                        ''')
+                        params.extend([month, match, *filter_params, limit])
+
+                    cursor = conn.execute(f"{' UNION ALL '.join(queries)} ORDER BY rank LIMIT ?",
+                                          [*params, limit])
+                    results.extend(cursor.fetchall())
+
+            results.sort(key=lambda row: row[-1])
+            return [MonthSearchRow._make(row[:-1]) for row in results[:limit]]
+
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка поиска по месяцам: {e}")
+            return []
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль выгрузки пунктов в Parquet
+Записывает пункты с данными файлов в набор Parquet, разбитый по месяцам и папкам,
+и загружает его обратно для аналитики
+"""
+
+import shutil
+from datetime import datetime
+from pathlib import Path
+from modules.month_databases import MonthDatabases
+
+# Колонки выгрузки (месяц и папка хранятся в именах каталогов разбиения)
+EXPORT_COLUMNS = ('broadcast_month', 'folder', 'filename', 'point_number', 'tag',
+                  'seconds', 'broadcast_at', 'content', 'short_content')
+
+# Значение разбиения для пунктов без даты выхода в эфир (соглашение Hive)
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+# Сколько строк собирать в одну группу строк Parquet
+ROW_GROUP_SIZE = 10000
+
+def _export_schema(pa):
+    """Схема файлов Parquet (без колонок разбиения)"""
+    return pa.schema([
+        ('filename', pa.string()),
+        ('point_number', pa.int32()),
+        ('tag', pa.string()),
+        ('seconds', pa.int32()),
+        ('broadcast_at', pa.timestamp('s')),
+        ('content', pa.string()),
+        ('short_content', pa.string()),
+    ])
+
+def _partition_dir(dataset_dir, month, folder):
+    """Каталог разбиения month=.../folder=..."""
+    return dataset_dir / f"month={month or NULL_PARTITION}" / f"folder={folder or NULL_PARTITION}"
+
+def export_points_to_parquet(export_path='parquet', months=None, databases=None,
+                             row_group_size=ROW_GROUP_SIZE):
+    """Выгружает пункты в набор Parquet <export_path>/points, разбитый по месяцам и папкам.
+
+    Пункты читаются из баз месяцев (все или months, см. MonthDatabases) потоком, упорядоченными по месяцу и папке, поэтому
+    открыт только один файл разбиения, а в памяти - не больше одной группы
+    строк. Набор собирается во временном каталоге и заменяет прежний целиком.
+    Возвращает число выгруженных пунктов или None при ошибке.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        print(f"❌ Не установлены необходимые библиотеки: {e}")
+        print("💡 Установите: pip install pyarrow")
+        return None
+
+    if databases is None:
+        databases = MonthDatabases()
+
+    export_dir = Path(export_path)
+    dataset_dir = export_dir / 'points'
+    temp_dir = export_dir / 'points.tmp'
+    schema = _export_schema(pa)
+
+    print("📦 ВЫГРУЗКА ПУНКТОВ В PARQUET")
+    print("=" * 40)
+
+    if temp_dir.exists():
+        shutil.rmtree(temp_dir)
+    temp_dir.mkdir(parents=True)
+
+    writer = None
+    partition = None
+    columns = {name: [] for name in schema.names}
+    total_points = 0
+    partitions = 0
+
+    def flush():
+        """Записывает накопленные строки текущего разбиения одной группой строк"""
+        if columns['filename']:
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            for values in columns.values():
+                values.clear()
+
+    try:
+        points = databases.iter_points(
+            months, EXPORT_COLUMNS,
+            order_by=('broadcast_month', 'folder', 'broadcast_at', 'filename', 'point_number'))
+
+        for point in points:
+            point_partition = (point.broadcast_month, point.folder)
+            if point_partition != partition:
+                if writer is not None:
+                    flush()
+                    writer.close()
+                partition = point_partition
+                partition_dir = _partition_dir(temp_dir, *partition)
+                partition_dir.mkdir(parents=True)
+                writer = pq.ParquetWriter(partition_dir / 'part-0.parquet', schema)
+                partitions += 1
+
+            columns['filename'].append(point.filename)
+            columns['point_number'].append(point.point_number)
+            columns['tag'].append(point.tag)
+            columns['seconds'].append(point.seconds)
+            columns['broadcast_at'].append(
+                datetime.fromisoformat(point.broadcast_at) if point.broadcast_at else None)
+            columns['content'].append(point.content)
+            columns['short_content'].append(point.short_content)
+            total_points += 1
+
+            if len(columns['filename']) >= row_group_size:
+                flush()
+
+        if writer is not None:
+            flush()
+            writer.close()
+            writer = None
+
+        # Заменяем прежний набор целиком
+        if dataset_dir.exists():
+            shutil.rmtree(dataset_dir)
+        temp_dir.rename(dataset_dir)
+
+    except Exception as e:
+        if writer is not None:
+            writer.close()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        print(f"❌ Ошибка выгрузки в Parquet: {e}")
+        return None
+
+    print(f"✅ Выгружено пунктов: {total_points} ({partitions} разбиений)")
+    print(f"📁 Набор данных: {dataset_dir.absolute()}")
+    return total_points
+
+def load_points_parquet(dataset_path='parquet/points', month=None, folder=None, columns=None):
+    """Загружает выгрузку export_points_to_parquet как таблицу pyarrow.
+
+    month ('ГГГГ-ММ') и folder - строка или список значений; читаются только
+    подходящие каталоги разбиения. columns - список нужных колонок (month и
+    folder тоже доступны). Для pandas: load_points_parquet(...).to_pandas().
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    # Типы разбиения задаются явно, иначе папка "2024" прочиталась бы числом
+    partitioning = ds.partitioning(
+        pa.schema([('month', pa.string()), ('folder', pa.string())]), flavor='hive')
+    dataset = ds.dataset(dataset_path, format='parquet', partitioning=partitioning)
+
+    filter_expression = None
+    for name, value in (('month', month), ('folder', folder)):
+        if value is None:
+            continue
+        values = [value] if isinstance(value, str) else list(value)
+        condition = ds.field(name).isin(values)
+        filter_expression = condition if filter_expression is None else filter_expression & condition
+
+    return dataset.to_table(columns=columns, filter=filter_expression)
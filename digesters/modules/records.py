@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль типов записей
+Компактные записи пунктов и файлов, общие для разбора, базы данных и просмотра
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+
+class Point:
+    """Пункт, найденный в тексте файла.
+
+    __slots__ вместо словаря: запись занимает в несколько раз меньше памяти,
+    что заметно на больших пачках, и опечатка в имени поля сразу дает ошибку.
+    """
+    __slots__ = ('point_number', 'tag', 'seconds', 'value', 'short_content')
+
+    def __init__(self, point_number, tag, seconds, value, short_content=None):
+        self.point_number = point_number
+        self.tag = tag
+        self.seconds = seconds
+        self.value = value
+        self.short_content = short_content
+
+    def _astuple(self):
+        return (self.point_number, self.tag, self.seconds, self.value, self.short_content)
+
+    def __eq__(self, other):
+        if not isinstance(other, Point):
+            return NotImplemented
+        return self._astuple() == other._astuple()
+
+    def __repr__(self):
+        return (f"Point(point_number={self.point_number!r}, tag={self.tag!r}, "
+                f"seconds={self.seconds!r}, value={self.value!r}, short_content={self.short_content!r})")
+
+class FileRecord:
+    """Сведения о файле для сохранения в таблицу files"""
+    __slots__ = ('filename', 'file_path', 'file_type', 'encoding', 'file_size',
+                 'file_mtime', 'content_hash', 'broadcast_at')
+
+    def __init__(self, filename, file_path, file_type, encoding, file_size=None,
+                 file_mtime=None, content_hash=None, broadcast_at=None):
+        self.filename = filename
+        self.file_path = file_path
+        self.file_type = file_type
+        self.encoding = encoding
+        self.file_size = file_size
+        self.file_mtime = file_mtime
+        self.content_hash = content_hash
+        self.broadcast_at = broadcast_at
+
+    def __repr__(self):
+        return f"FileRecord(file_path={str(self.file_path)!r}, encoding={self.encoding!r})"
+
+# Сохраненное состояние файла для инкрементальной загрузки
+FileState = namedtuple('FileState', 'id file_size file_mtime content_hash points_count')
+
+# Строка сводки по (папка, тег)
+RollupRow = namedtuple('RollupRow', 'folder tag points_count total_seconds short_count short_seconds')
+
+# Результат полнотекстового поиска
+SearchRow = namedtuple('SearchRow', 'filename folder point_number tag seconds content short_content snippet')
+
+# Результат поиска по нескольким месяцам (см. MonthDatabases.search_points)
+MonthSearchRow = namedtuple('MonthSearchRow', ('month',) + SearchRow._fields)
+
+@lru_cache(maxsize=None)
+def point_row_type(columns):
+    """Тип строки выборки пунктов с полями columns (кортеж имен колонок)"""
+    return namedtuple('PointRow', columns)
+
+def row_factory(row_type):
+    """row_factory для курсора sqlite3: строки выборки превращаются в row_type"""
+    make = row_type._make
+    return lambda cursor, row: make(row)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль шаблона Excel-отчета
+Шаблон разбирается один раз за запуск, книги отчетов создаются из его копии в памяти
+"""
+
+import pickle
+from pathlib import Path
+
+# Плейсхолдеры шапки отчета в порядке замены
+HEADER_PLACEHOLDERS = ('YXXX', 'MXXX', 'GXXX', 'CXXX', 'CFXXX')
+
+# Область шапки, в которой ищутся плейсхолдеры (строки 1-19, колонки A-I)
+HEADER_MAX_ROW = 19
+HEADER_MAX_COLUMN = 9
+
+def find_placeholder_cells(ws):
+    """Координаты (строка, колонка) ячеек шапки, содержащих плейсхолдеры"""
+    return tuple(
+        (cell.row, cell.column)
+        for row in ws.iter_rows(max_row=HEADER_MAX_ROW, max_col=HEADER_MAX_COLUMN)
+        for cell in row
+        if isinstance(cell.value, str) and any(placeholder in cell.value for placeholder in HEADER_PLACEHOLDERS)
+    )
+
+class ReportTemplate:
+    """Разобранный шаблон отчета.
+
+    Книга шаблона хранится в памяти в сериализованном виде: восстановить ее
+    из pickle во много раз быстрее, чем заново разбирать zip и стили xlsx,
+    а каждая new_workbook() - независимая копия. Ячейки с плейсхолдерами
+    шапки находятся один раз (placeholder_cells для fill_report_header).
+    """
+
+    def __init__(self, template_path):
+        from openpyxl import load_workbook
+
+        self.template_path = Path(template_path)
+        workbook = load_workbook(self.template_path)
+        self.placeholder_cells = find_placeholder_cells(workbook.active)
+        self._snapshot = pickle.dumps(workbook, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def new_workbook(self):
+        """Новая книга отчета - копия шаблона"""
+        return pickle.loads(self._snapshot)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль кэша извлеченного текста
+Хранит текст документов между запусками, ключ - хэш содержимого и версия извлечения
+"""
+
+import sqlite3
+import threading
+import time
+
+class TextCache:
+    def __init__(self, cache_path="text_cache.db", max_size_mb=512):
+        """Инициализация кэша"""
+        self.cache_path = cache_path
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._pending = []
+        self._touched = []
+        # Соединения потоков чтения: по одному на поток (см. get)
+        self._readers = threading.local()
+        self._reader_connections = []
+        self._readers_lock = threading.Lock()
+        self.init_cache()
+
+    def init_cache(self):
+        """Создает таблицу кэша"""
+        try:
+            with sqlite3.connect(self.cache_path) as conn:
+                cursor = conn.cursor()
+
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS extracted_text (
+                        cache_key TEXT PRIMARY KEY,
+                        content TEXT NOT NULL,
+                        encoding TEXT,
+                        size INTEGER NOT NULL,
+                        last_used REAL NOT NULL
+                    )
+                ''')
+
+                cursor.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_extracted_text_last_used
+                    ON extracted_text (last_used)
+                ''')
+
+                conn.commit()
+
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка создания кэша текста: {e}")
+
+    @staticmethod
+    def make_key(content_hash, file_type, extractor_version):
+        """Ключ кэша: хэш содержимого, тип файла и версия извлечения текста"""
+        return f"{content_hash}:{file_type}:{extractor_version}"
+
+    def get(self, cache_key):
+        """Возвращает (текст, кодировка) из кэша или None. Не изменяет кэш.
+
+        Вызывается из потоков чтения: каждый поток открывает одно соединение
+        и держит его до close_readers(), а не подключается заново на каждый файл.
+        """
+        try:
+            conn = getattr(self._readers, 'conn', None)
+            if conn is None:
+                # Закрывает соединение close_readers() из другого потока
+                conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+                self._readers.conn = conn
+                with self._readers_lock:
+                    self._reader_connections.append(conn)
+
+            # fetchall() завершает запрос, чтобы чтение не мешало flush() писать
+            rows = conn.execute('''
+                SELECT content, encoding FROM extracted_text WHERE cache_key = ?
+            ''', (cache_key,)).fetchall()
+            return rows[0] if rows else None
+
+        except sqlite3.Error:
+            return None
+
+    def close_readers(self):
+        """Закрывает соединения потоков чтения (когда потоки уже остановлены)"""
+        with self._readers_lock:
+            for conn in self._reader_connections:
+                conn.close()
+            self._reader_connections.clear()
+        self._readers = threading.local()
+
+    def record_hit(self, cache_key):
+        """Учитывает попадание; время использования обновится при flush()"""
+        self.hits += 1
+        self._touched.append(cache_key)
+
+    def record_miss(self):
+        """Учитывает промах (текст извлечен заново, даже если в кэш он не попадет)"""
+        self.misses += 1
+
+    def put(self, cache_key, content, encoding, batch_size=100):
+        """Добавляет текст в кэш (записывается пачками)"""
+        self._pending.append((cache_key, content, encoding, len(content.encode('utf-8'))))
+        if len(self._pending) >= batch_size:
+            self.flush(evict=False)
+
+    def flush(self, evict=True):
+        """Записывает накопленные изменения и при необходимости вытесняет старые записи"""
+        now = time.time()
+        try:
+            with sqlite3.connect(self.cache_path) as conn:
+                cursor = conn.cursor()
+
+                cursor.executemany('''
+                    INSERT OR REPLACE INTO extracted_text (cache_key, content, encoding, size, last_used)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', [entry + (now,) for entry in self._pending])
+
+                cursor.executemany('''
+                    UPDATE extracted_text SET last_used = ? WHERE cache_key = ?
+                ''', [(now, cache_key) for cache_key in self._touched])
+
+                if evict:
+                    self._evict(cursor)
+
+                conn.commit()
+
+        except sqlite3.Error as e:
+            print(f"❌ Ошибка записи кэша текста: {e}")
+
+        self._pending.clear()
+        self._touched.clear()
+
+    def _evict(self, cursor):
+        """Удаляет давно не использованные записи, пока кэш не уложится в лимит"""
+        cursor.execute('SELECT COALESCE(SUM(size), 0) FROM extracted_text')
+        excess = cursor.fetchone()[0] - self.max_size_bytes
+        if excess <= 0:
+            return
+
+        cursor.execute('SELECT cache_key, size FROM extracted_text ORDER BY last_used')
+        evicted = []
+        for cache_key, size in cursor.fetchall():
+            if excess <= 0:
+                break
+            evicted.append((cache_key,))
+            excess -= size
+
+        cursor.executemany('DELETE FROM extracted_text WHERE cache_key = ?', evicted)
+
+    def hit_rate(self):
+        """Доля попаданий среди обращений за текущий запуск"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Модуль потоковой записи строк в лист xlsx
+Шапку, стили и рисунки книги сохраняет openpyxl, а строки данных пишутся
+прямо в XML листа, без объектов ячеек openpyxl
+"""
+
+import io
+import re
+import shutil
+import tempfile
+import zipfile
+from xml.sax.saxutils import escape
+
+# Сколько строк XML собирать перед записью в архив
+WRITE_BATCH_ROWS = 1000
+
+# Сколько байт XML строк держать в памяти (дальше - временный файл)
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# Символы, недопустимые в XML (как в openpyxl)
+_ILLEGAL_XML_CHARS_RE = re.compile(r'[\000-\010]|[\013-\014]|[\016-\037]')
+
+_ROW_RE = re.compile(r'<row r="(\d+)"(?:\s[^>]*?)?(?:/>|>(.*?)</row>)', re.DOTALL)
+_CELL_STYLE_RE = re.compile(r'<c r="([A-Z]+)\d+"([^>]*?)/?>')
+_STYLE_ATTR_RE = re.compile(r'\bs="(\d+)"')
+_DIMENSION_RE = re.compile(r'<dimension ref="([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?"\s*/>')
+_COLS_RE = re.compile(r'<cols>(.*?)</cols>', re.DOTALL)
+_COL_RE = re.compile(r'<col\b[^>]*?\bmin="(\d+)"[^>]*?\bmax="(\d+)"[^>]*/>|<col\b[^>]*/>')
+
+def _column_index(letters):
+    """Номер колонки по буквам ('A' -> 1, 'AA' -> 27)"""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index
+
+def _split_sheet(sheet_xml, start_row):
+    """Делит XML листа на части до и после строки-образца start_row.
+
+    Возвращает (начало, номера стилей ячеек образца {колонка: s}, конец).
+    Если образца нет, строки вставляются перед первой строкой шаблона
+    с большим номером или в конец sheetData.
+    """
+    sheet_xml = sheet_xml.replace('<sheetData/>', '<sheetData></sheetData>')
+    end = sheet_xml.index('</sheetData>')
+    for row in _ROW_RE.finditer(sheet_xml, sheet_xml.index('<sheetData'), end):
+        number = int(row.group(1))
+        if number < start_row:
+            continue
+        if number > start_row:
+            return sheet_xml[:row.start()], {}, sheet_xml[row.start():]
+
+        styles = {}
+        for column, attributes in _CELL_STYLE_RE.findall(row.group(2) or ''):
+            style = _STYLE_ATTR_RE.search(attributes)
+            if style:
+                styles[column] = style.group(1)
+        return sheet_xml[:row.start()], styles, sheet_xml[row.end():]
+
+    return sheet_xml[:end], {}, sheet_xml[end:]
+
+def _drop_rows(tail, last_row):
+    """Убирает из конца листа строки шаблона с номерами до last_row включительно:
+    их места заняли записанные строки, а номера строк в sheetData должны
+    возрастать и не повторяться"""
+    end = tail.index('</sheetData>')
+    rows = [row.group(0) for row in _ROW_RE.finditer(tail, 0, end) if int(row.group(1)) > last_row]
+    return ''.join(rows) + tail[end:]
+
+def _patch_dimension(head, last_row, last_column):
+    """Расширяет <dimension> листа до последней записанной строки и колонки"""
+    match = _DIMENSION_RE.search(head)
+    if match is None:
+        return head
+    first_column, first_row, end_column, end_row = match.groups()
+    end_column = end_column or first_column
+    end_row = int(end_row or first_row)
+    if _column_index(last_column) > _column_index(end_column):
+        end_column = last_column
+    ref = f'{first_column}{first_row}:{end_column}{max(end_row, last_row)}'
+    return head[:match.start()] + f'<dimension ref="{ref}"/>' + head[match.end():]
+
+def _patch_cols(head, widths):
+    """Задает ширины колонок widths {буквы: ширина} в <cols> листа"""
+    indexes = {_column_index(column): width for column, width in widths.items()}
+    entries = []
+    match = _COLS_RE.search(head)
+    if match is not None:
+        for col in _COL_RE.finditer(match.group(1)):
+            first, last = col.group(1), col.group(2)
+            if first is not None and first == last and int(first) in indexes:
+                continue
+            entries.append((int(first or 0), col.group(0)))
+    for index, width in indexes.items():
+        entries.append((index, f'<col min="{index}" max="{index}" width="{width:g}" customWidth="1"/>'))
+    cols_xml = '<cols>' + ''.join(xml for index, xml in sorted(entries, key=lambda entry: entry[0])) + '</cols>'
+
+    if match is not None:
+        return head[:match.start()] + cols_xml + head[match.end():]
+    position = head.index('<sheetData')
+    return head[:position] + cols_xml + head[position:]
+
+def _cell_xml(reference, style, value):
+    """XML ячейки: число, строка (inlineStr) или пустая ячейка со стилем"""
+    if value is None:
+        return f'<c r="{reference}"{style}/>'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c r="{reference}"{style} t="n"><v>{value}</v></c>'
+    text = _ILLEGAL_XML_CHARS_RE.sub('', str(value))
+    space = ' xml:space="preserve"' if text != text.strip() else ''
+    return f'<c r="{reference}"{style} t="inlineStr"><is><t{space}>{escape(text)}</t></is></c>'
+
+def save_workbook_with_rows(wb, filename, start_row, columns, rows, autosize=False, max_width=50):
+    """Сохраняет книгу wb, записывая строки rows в ее активный лист прямо в XML.
+
+    rows - последовательности значений для колонок columns (например,
+    'BCDE'), пишутся подряд начиная с start_row. Стили ячеек берутся из
+    строки-образца start_row, подготовленной в openpyxl (ячейки без значений,
+    только со стилем): ее номера стилей общие для всех строк, а сама она
+    и строки шаблона под ней, чьи номера заняты новыми строками,
+    заменяются данными. Строки не накапливаются в памяти. autosize -
+    ширина колонок columns по самому длинному значению (с учетом шапки) + 2,
+    но не больше max_width; ширина считается по ходу записи строк.
+    Возвращает число записанных строк.
+    """
+    ws = wb.active
+    sheet_path = f"xl/worksheets/sheet{wb.index(ws) + 1}.xml"
+
+    lengths = {}
+    if autosize:
+        for row in ws.iter_rows(max_row=start_row - 1):
+            for cell in row:
+                if cell.value is not None and cell.column_letter in columns:
+                    lengths[cell.column_letter] = max(lengths.get(cell.column_letter, 0), len(str(cell.value)))
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+
+    with zipfile.ZipFile(buffer) as source, zipfile.ZipFile(filename, 'w', zipfile.ZIP_DEFLATED) as target:
+        head, styles, tail = _split_sheet(source.read(sheet_path).decode('utf-8'), start_row)
+        cells = [(column, f' s="{styles[column]}"' if column in styles else '') for column in columns]
+
+        def write_rows(stream):
+            """Пишет строки в stream пачками; возвращает число строк"""
+            batch = []
+            count = 0
+            for count, values in enumerate(rows, 1):
+                row_number = start_row + count - 1
+                row_xml = [f'<row r="{row_number}">']
+                for (column, style), value in zip(cells, values):
+                    row_xml.append(_cell_xml(f'{column}{row_number}', style, value))
+                    if autosize and value is not None:
+                        lengths[column] = max(lengths.get(column, 0), len(str(value)))
+                row_xml.append('</row>')
+                batch.append(''.join(row_xml))
+                if len(batch) >= WRITE_BATCH_ROWS:
+                    stream.write(''.join(batch).encode('utf-8'))
+                    batch.clear()
+            stream.write(''.join(batch).encode('utf-8'))
+            return count
+
+        def sheet_head(count):
+            """Начало листа с учетом записанных строк"""
+            sheet = _patch_dimension(head, start_row + count - 1, columns[-1]) if count else head
+            if autosize and lengths:
+                sheet = _patch_cols(sheet, {column: min(length + 2, max_width)
+                                            for column, length in lengths.items()})
+            return sheet.encode('utf-8')
+
+        for item in source.infolist():
+            if item.filename != sheet_path:
+                target.writestr(item, source.read(item.filename))
+                continue
+
+            info = zipfile.ZipInfo(sheet_path, date_time=item.date_time)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            # Размер листа (<dimension>) и ширины колонок (<cols>) идут до
+            # <sheetData>, а известны только после всех строк, поэтому строки
+            # сначала пишутся во временный буфер (большой уходит на диск)
+            with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+                count = write_rows(spool)
+                spool.seek(0)
+                with target.open(info, 'w') as stream:
+                    stream.write(sheet_head(count))
+                    shutil.copyfileobj(spool, stream)
+                    stream.write(_drop_rows(tail, start_row + count - 1).encode('utf-8'))
+
+    return count
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""Общая настройка тестов: модули digesters импортируются как в main.py (from modules...)"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты разбора текста на пункты (parse_text_into_points)
+Сравнение с прежним разбором из восьми регулярных выражений, форматы пунктов
+и проверка линейного времени работы
+"""
+
+import random
+import re
+import time
+
+import pytest
+
+from modules.folder_processor import normalize_tag, parse_text_into_points
+
+# Прежний разбор (до однопроходного сканера), сохранен без изменений как эталон
+_LEGACY_PATTERNS = [
+    r'(\d+)\.\s*\(\s*([^-()]+?)\s*[-–—]?\s*(\d+)\s*\)\s*(.*?)(?=\d+[.)]\s*\(|$)',
+    r'(\d+)\.\s*\(\s*([^-()0-9\s]+(?:\s+[^-()0-9\s]+)*)\s+(\d+)\s*\)\s*(.*?)(?=\d+[.)]\s*\(|$)',
+    r'(\d+)\)\s*\(\s*([^-()]+?)\s*[-–—]?\s*(\d+)\s*\)\s*(.*?)(?=\d+[.)]\s*\(|$)',
+    r'(\d+)\)\s*\(\s*([^-()0-9\s]+(?:\s+[^-()0-9\s]+)*)\s+(\d+)\s*\)\s*(.*?)(?=\d+[.)]\s*\(|$)',
+    r'(\d+)\.\s*\(\s*([^-()]+?)\s*[-–—]?\s*(\d+)\s*\)\s*(.*?)$',
+    r'(\d+)\.\s*\(\s*([^-()0-9\s]+(?:\s+[^-()0-9\s]+)*)\s+(\d+)\s*\)\s*(.*?)$',
+    r'(\d+)\)\s*\(\s*([^-()]+?)\s*[-–—]?\s*(\d+)\s*\)\s*(.*?)$',
+    r'(\d+)\)\s*\(\s*([^-()0-9\s]+(?:\s+[^-()0-9\s]+)*)\s+(\d+)\s*\)\s*(.*?)$'
+]
+
+def legacy_parse_text_into_points(text_content):
+    """Прежний parse_text_into_points: (номер, тег, секунды, текст) в порядке номеров"""
+    if not text_content or not isinstance(text_content, str):
+        return []
+
+    points = []
+    found_positions = set()
+    for pattern in _LEGACY_PATTERNS:
+        for match in re.finditer(pattern, text_content, re.DOTALL | re.IGNORECASE):
+            start_pos = match.start()
+            if start_pos not in found_positions:
+                found_positions.add(start_pos)
+                point_text = match.group(4).strip()
+                if len(point_text) >= 10:
+                    points.append((int(match.group(1)), normalize_tag(match.group(2).strip()),
+                                   int(match.group(3)), point_text))
+
+    points.sort(key=lambda point: point[0])
+    return points
+
+def parse(text_content):
+    """Пункты нового разбора в виде кортежей, как у legacy_parse_text_into_points"""
+    return [(point.point_number, point.tag, point.seconds, point.value)
+            for point in parse_text_into_points(text_content)]
+
+# Фрагменты для случайных текстов: части заголовков пунктов и обычный текст
+_FUZZ_PIECES = (
+    '1', '2', '12', '7', '0', '.', ')', '(', ')', '-', '–', '—', ' ', '  ', '\n', '\t',
+    'губер', 'админ', 'гор дума', 'Губернатор', 'x', 'текст пункта', 'ещё', ':', '.(', ') (',
+)
+
+def _random_text(rng):
+    """Случайный текст из фрагментов или случайный заголовок пункта с телом"""
+    if rng.random() < 0.5:
+        return ''.join(rng.choice(_FUZZ_PIECES) for _ in range(rng.randint(0, 40)))
+
+    parts = []
+    for _ in range(rng.randint(1, 4)):
+        number = str(rng.randint(0, 30))
+        marker = rng.choice(('.', ')', '. ', ') '))
+        tag = rng.choice(('губер', 'админ', 'гор дума', 'обл. дума', 'x y', '', '1'))
+        separator = rng.choice(('-', '–', '—', ' ', ' - ', '', '  '))
+        seconds = rng.choice(('57', '5', '', '0'))
+        spaces = rng.choice(('', ' ', '\n'))
+        body = rng.choice(('Первый пункт текст', 'коротко', '', 'текст 3.(губер-1) хвост',
+                           'длинный текст пункта\nс переносом', '(скобки) внутри текста'))
+        parts.append(f"{number}{marker}({spaces}{tag}{separator}{seconds}{spaces}){spaces}{body}")
+    return rng.choice(('', ' ', '\n')).join(parts)
+
+def test_matches_legacy_parser_on_random_texts():
+    """Новый разбор дает те же пункты, что и прежние восемь шаблонов"""
+    rng = random.Random(20240701)
+    for _ in range(20000):
+        text = _random_text(rng)
+        assert parse(text) == legacy_parse_text_into_points(text), repr(text)
+
+@pytest.mark.parametrize('text, expected', [
+    # N.(тег-сек)
+    ('1.(губер-57) Первый пункт текст',
+     [(1, 'губер', 57, 'Первый пункт текст')]),
+    # Пробелы вокруг скобок и внутри
+    ('1. ( губер - 57 ) Первый пункт текст',
+     [(1, 'губер', 57, 'Первый пункт текст')]),
+    # N) (тег сек)
+    ('3) (губер 49) Третий пункт текста',
+     [(3, 'губер', 49, 'Третий пункт текста')]),
+    # Тег из нескольких слов
+    ('2) (городская дума 30) Текст про думу',
+     [(2, 'гордума', 30, 'Текст про думу')]),
+    ('4.(обл. дума 15) Текст про облдуму',
+     [(4, 'облдума', 15, 'Текст про облдуму')]),
+    # Длинное и короткое тире
+    ('1.(админ–40) Текст администрации 2.(губер—63) Текст губернатора',
+     [(1, 'админ', 40, 'Текст администрации'), (2, 'губер', 63, 'Текст губернатора')]),
+    # Слишком короткий текст пропускается
+    ('1.(губер-57) коротко', []),
+])
+def test_point_formats(text, expected):
+    assert parse(text) == expected
+    assert legacy_parse_text_into_points(text) == expected
+
+def test_points_sorted_by_number_and_deduplicated():
+    """Пункты сортируются по номеру, позиция заголовка учитывается один раз"""
+    text = '2.(губер-10) Второй пункт текст\n1.(админ-20) Первый пункт текст\n2) (губер 30) Еще второй текст'
+    expected = [
+        (1, 'админ', 20, 'Первый пункт текст'),
+        (2, 'губер', 10, 'Второй пункт текст'),
+        (2, 'губер', 30, 'Еще второй текст'),
+    ]
+    assert parse(text) == expected
+    assert legacy_parse_text_into_points(text) == expected
+
+def test_text_ends_at_unrecognised_header():
+    """Текст пункта обрывается на следующем заголовке, даже нераспознанном"""
+    text = '1.(губер-57) Первый пункт текст 2.(без времени) хвост второго пункта'
+    expected = [(1, 'губер', 57, 'Первый пункт текст')]
+    assert parse(text) == expected
+    assert legacy_parse_text_into_points(text) == expected
+
+def _best_time(text, repeats=3):
+    """Лучшее время разбора text из нескольких запусков"""
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        parse_text_into_points(text)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+@pytest.mark.parametrize('piece', ['1.(', '1', '1.(губер', '1.(губер-57) ', '1) (а ', '(' + ' ' * 10])
+def test_parse_time_is_linear(piece):
+    """При росте текста в 4 раза время растет примерно в 4 раза (квадратичный рост - в 16)"""
+    small = _best_time(piece * 5000)
+    large = _best_time(piece * 20000)
+    assert large < max(small, 1e-3) * 10, (small, large)
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Тесты потоковой записи строк в лист xlsx (save_workbook_with_rows)
+Проверяется сырой XML листа: openpyxl при чтении скрывает повторы и
+неупорядоченные номера строк
+"""
+
+import re
+import zipfile
+from pathlib import Path
+
+import pytest
+
+openpyxl = pytest.importorskip('openpyxl')
+
+from openpyxl.styles import Border, Side
+
+from modules.xlsx_writer import save_workbook_with_rows
+
+TEMPLATE_PATH = Path(__file__).resolve().parents[2] / 'static' / 'template.xlsx'
+
+def sheet_row_numbers(filename):
+    """Номера строк (<row r=...>) в sheetData первого листа по порядку"""
+    with zipfile.ZipFile(filename) as archive:
+        sheet_xml = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+    return [int(number) for number in re.findall(r'<row r="(\d+)"', sheet_xml)]
+
+def assert_strictly_increasing(numbers):
+    assert all(first < second for first, second in zip(numbers, numbers[1:])), numbers
+
+def make_workbook(start_row):
+    """Книга с шапкой, строкой-образцом start_row и строками шаблона под ней"""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for row in range(1, start_row):
+        ws.cell(row=row, column=2, value=f'шапка {row}')
+    thin = Side(style='thin')
+    for column in range(2, 6):
+        ws.cell(row=start_row, column=column).border = Border(left=thin, right=thin)
+    for row in (start_row + 1, start_row + 3, start_row + 10):
+        ws.row_dimensions[row].height = 20
+        ws.cell(row=row, column=7).border = Border(top=thin)
+    return wb
+
+@pytest.mark.parametrize('count', [0, 1, 2, 5, 20])
+def test_rows_unique_and_ascending(tmp_path, count):
+    """Строки шаблона под образцом не повторяют номера записанных строк"""
+    filename = tmp_path / 'report.xlsx'
+    rows = [(i, f'текст {i}', i * 10, None) for i in range(count)]
+    assert save_workbook_with_rows(make_workbook(5), filename, 5, 'BCDE', rows) == count
+
+    numbers = sheet_row_numbers(filename)
+    assert_strictly_increasing(numbers)
+    last_row = 5 + count - 1
+    assert [number for number in numbers if number >= 5] == \
+        list(range(5, last_row + 1)) + [number for number in (6, 8, 15) if number > last_row]
+
+    ws = openpyxl.load_workbook(filename).active
+    assert [ws.cell(row=5 + i, column=3).value for i in range(count)] == [row[1] for row in rows]
+
+def test_sample_row_missing(tmp_path):
+    """Без строки-образца строки встают перед строками шаблона с большими номерами"""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws['A1'] = 'шапка'
+    ws['A10'] = 'подвал'
+    filename = tmp_path / 'report.xlsx'
+    save_workbook_with_rows(wb, filename, 3, 'AB', [('a', 1), ('b', 2)])
+
+    assert sheet_row_numbers(filename) == [1, 3, 4, 10]
+    ws = openpyxl.load_workbook(filename).active
+    assert (ws['A3'].value, ws['B4'].value, ws['A10'].value) == ('a', 2, 'подвал')
+
+@pytest.mark.skipif(not TEMPLATE_PATH.exists(), reason='нет static/template.xlsx')
+@pytest.mark.parametrize('count', [1, 3, 40])
+def test_report_template_rows_ascending(tmp_path, count):
+    """Шаблон отчета: строки 16-19 под образцом не дублируются после данных"""
+    wb = openpyxl.load_workbook(TEMPLATE_PATH)
+    filename = tmp_path / 'report.xlsx'
+    rows = [(i, '01.07.2024 10:00', f'пункт {i}', 30) for i in range(1, count + 1)]
+    save_workbook_with_rows(wb, filename, 15, 'BCDE', rows)
+
+    numbers = sheet_row_numbers(filename)
+    assert_strictly_increasing(numbers)
+    assert set(range(15, 15 + count)) <= set(numbers)
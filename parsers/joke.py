@@ -7,8 +7,8 @@ import re
 import yaml
 import shutil
 from docx import Document
-from docx.shared import Inches
 from docx.enum.table import WD_ALIGN_VERTICAL
+from news_logo import document_logo
 
 
 class JokeParser:
@@ -213,6 +213,9 @@ class JokeParser:
             return None
         site_domain = company_config.get('domain', 'astrobl.ru')
         logo_path = company_config.get('logo_path', '../static/logos/logo_juka.png')
+        # Лого читается один раз на процесс и добавляется в документ один раз,
+        # строки таблицы ссылаются на него
+        logo = document_logo(doc, logo_path)
         table = doc.add_table(rows=1, cols=4)
         table.style = 'Table Grid'
         headers = [
@@ -262,11 +265,11 @@ class JokeParser:
             for c in r1:
                 c.vertical_alignment = WD_ALIGN_VERTICAL.CENTER
             try:
-                if os.path.exists(logo_path):
+                if logo is not None:
                     p = r1[0].paragraphs[0]
                     p.alignment = 1
                     run = p.runs[0] if p.runs else p.add_run()
-                    run.add_picture(logo_path, width=Inches(0.5))
+                    logo.add_to_run(run)
                 else:
                     r1[0].text = '[ЛОГО]'
                     r1[0].paragraphs[0].alignment = 1
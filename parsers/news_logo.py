@@ -0,0 +1,60 @@
+import importlib.util
+import io
+import os
+from docx.oxml.shape import CT_Inline
+from docx.shared import Inches
+
+# Логотип в таблицах новостей. Кэш логотипов общий с digesters: его модуль
+# подключается по явному пути к файлу, sys.path не меняется
+
+LOGO_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               '..', 'digesters', 'modules', 'logo_cache.py')
+
+# Ширина логотипа в таблице новостей и она же в пикселях при 96 dpi
+NEWS_LOGO_WIDTH = Inches(0.5)
+NEWS_LOGO_WIDTH_PX = 48
+
+
+def _load_logo_cache(path=LOGO_CACHE_PATH):
+    """Загружает модуль кэша логотипов из файла path"""
+    spec = importlib.util.spec_from_file_location('logo_cache', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+_logo_cache = _load_logo_cache()
+
+
+class DocumentLogo:
+    """Логотип, добавленный в документ одной частью-изображением.
+    Строки таблицы только ссылаются на нее: python-docx не перечитывает
+    и не хэширует изображение на каждую вставку, как в run.add_picture.
+    Номера фигур выдаются по порядку от part.next_id без поиска по всему
+    документу, поэтому пока строятся строки, другие фигуры не добавляются"""
+
+    def __init__(self, part, rel_id, filename, cx, cy):
+        self._rel_id = rel_id
+        self._filename = filename
+        self._cx = cx
+        self._cy = cy
+        self._next_id = part.next_id
+
+    def add_to_run(self, run):
+        """Вставляет логотип в конец run"""
+        inline = CT_Inline.new_pic_inline(self._next_id, self._rel_id, self._filename, self._cx, self._cy)
+        self._next_id += 1
+        run._r.add_drawing(inline)
+
+
+def document_logo(doc, logo_path, width=NEWS_LOGO_WIDTH):
+    """Логотип logo_path для документа doc или None, если файла нет или он не читается"""
+    logo = _logo_cache.load_logo(logo_path, NEWS_LOGO_WIDTH_PX)
+    if logo is None:
+        return None
+    try:
+        rel_id, image = doc.part.get_or_add_image(io.BytesIO(logo.data))
+    except Exception:
+        return None
+    cx, cy = image.scaled_dimensions(width, None)
+    return DocumentLogo(doc.part, rel_id, image.filename, cx, cy)
@@ -8,9 +8,9 @@ import re
 import yaml
 import shutil
 from docx import Document
-from docx.shared import Inches
 from docx.enum.table import WD_ALIGN_VERTICAL  # Добавляем импорт для вертикального выравнивания
 from docx.oxml.shared import OxmlElement, qn
+from news_logo import document_logo
 
 
 class RadioVolnaParser:
@@ -318,6 +318,9 @@ class RadioVolnaParser:
         # Получаем домен и путь к лого из конфига
         site_domain = company_config.get('domain', 'radiovolna.fm')
         logo_path = company_config.get('logo_path', '../static/logos/logo_juka.png')
+        # Лого читается один раз на процесс и добавляется в документ один раз,
+        # строки таблицы ссылаются на него
+        logo = document_logo(doc, logo_path)
         
         # Создаем таблицу
         # Количество строк: 1 (заголовок) + (количество новостей * 2)
@@ -363,12 +366,12 @@ class RadioVolnaParser:
             
             # Пытаемся вставить лого, если не получается - вставляем текст
             try:
-                if os.path.exists(logo_path):
+                if logo is not None:
                     # Добавляем изображение лого
                     paragraph = row1_cells[0].paragraphs[0]
                     paragraph.alignment = 1  # Центрируем лого горизонтально
                     run = paragraph.runs[0] if paragraph.runs else paragraph.add_run()
-                    run.add_picture(logo_path, width=Inches(0.5))  # Размер лого
+                    logo.add_to_run(run)
                 else:
                     row1_cells[0].text = f"[ЛОГО]"
                     row1_cells[0].paragraphs[0].alignment = 1  # Центрируем горизонтально
@@ -460,6 +463,7 @@ class RadioVolnaParser:
             if news_with_keywords:
                 site_domain = company_config.get('domain', 'radiovolna.fm')
                 logo_path = company_config.get('logo_path', '../static/logos/logo_juka.png')
+                logo = document_logo(doc, logo_path)
                 
                 # Создаем таблицу
                 table = doc.add_table(rows=1, cols=4)
@@ -499,11 +503,11 @@ class RadioVolnaParser:
                     
                     # Лого
                     try:
-                        if os.path.exists(logo_path):
+                        if logo is not None:
                             paragraph_logo = row1_cells[0].paragraphs[0]
                             paragraph_logo.alignment = 1
                             run = paragraph_logo.runs[0] if paragraph_logo.runs else paragraph_logo.add_run()
-                            run.add_picture(logo_path, width=Inches(0.5))
+                            logo.add_to_run(run)
                         else:
                             row1_cells[0].text = "[ЛОГО]"
                             row1_cells[0].paragraphs[0].alignment = 1